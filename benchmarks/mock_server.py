@@ -0,0 +1,164 @@
+import re
+import gzip
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Локальная замена /v3/graphql: поддерживает limit/after/filter, выборку полей,
+# псевдонимы корневых полей и extensions.pageInfo, как у портала; с compress=True
+# ответ сжимается gzip, если клиент его принимает
+
+TOKEN_RE = re.compile(r'\$?[A-Za-z_][A-Za-z0-9_]*|[{}():,!\[\]]')
+
+# Фильтры, сравниваемые по диапазону дат [с, по] (по первым 10 символам)
+DATE_RANGE_FILTERS = {"signDate", "publishDate"}
+
+def _parse_selection(tokens, pos):
+    """Разбор набора полей { ... } -> (список (псевдоним, имя, аргументы, вложенный набор), позиция)"""
+    fields = []
+    pos += 1  # "{"
+    while tokens[pos] != "}":
+        name = tokens[pos]
+        alias = name
+        pos += 1
+        if tokens[pos] == ":":
+            name = tokens[pos + 1]
+            pos += 2
+        args = {}
+        if tokens[pos] == "(":
+            pos += 1
+            while tokens[pos] != ")":
+                if tokens[pos] == ",":
+                    pos += 1
+                    continue
+                arg_name, value = tokens[pos], tokens[pos + 2]
+                args[arg_name] = value
+                pos += 3
+            pos += 1
+        selection = None
+        if tokens[pos] == "{":
+            selection, pos = _parse_selection(tokens, pos)
+        fields.append((alias, name, args, selection))
+    return fields, pos + 1
+
+def parse_query(query):
+    """Корневые поля операции GraphQL"""
+    tokens = TOKEN_RE.findall(query)
+    pos = tokens.index("{")
+    fields, _ = _parse_selection(tokens, pos)
+    return fields
+
+def project(record, selection):
+    """Оставляет в записи только запрошенные поля"""
+    if record is None:
+        return None
+    if isinstance(record, list):
+        return [project(item, selection) for item in record]
+    result = {}
+    for alias, name, _, sub in selection:
+        value = record.get(name)
+        result[alias] = project(value, sub) if sub and value is not None else value
+    return result
+
+def _matches(record, filter):
+    for key, expected in filter.items():
+        if key in ("customerBin", "orgBin"):
+            continue
+        value = record.get(key)
+        if key in DATE_RANGE_FILTERS:
+            if not value or not (expected[0] <= value[:10] <= expected[1]):
+                return False
+        elif isinstance(expected, (list, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+class MockGraphQLServer:
+    """Локальный HTTP-сервер с данными Contract/TrdBuy (и справочниками) в памяти"""
+
+    def __init__(self, contracts, announcements=(), latency=0.0, references=None, compress=False):
+        self.datasets = {"Contract": contracts, "TrdBuy": list(announcements), **(references or {})}
+        self.latency = latency
+        self.compress = compress
+        self.indexes = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _index(self, name, dataset):
+        """Словарь {id: запись} набора (пересоздаётся, если набор заменён)"""
+        cached = self.indexes.get(name)
+        if cached is None or cached[0] is not dataset:
+            cached = (dataset, {r["id"]: r for r in dataset})
+            self.indexes[name] = cached
+        return cached[1]
+
+    def resolve(self, body):
+        """Выполнение запроса: по странице на каждое корневое поле"""
+        variables = body.get("variables") or {}
+        data = {}
+        page_info = None
+        for alias, name, args, selection in parse_query(body["query"]):
+            values = {key: variables.get(var[1:]) if var.startswith("$") else var for key, var in args.items()}
+            limit = int(values.get("limit") or 50)
+            after = int(values.get("after") or 0)
+            filter = {key: set(value) if isinstance(value, list) and key not in DATE_RANGE_FILTERS else value
+                      for key, value in (values.get("filter") or {}).items()}
+            dataset = self.datasets.get(name, [])
+            if "id" in filter:
+                # Выборка по списку id (вторая фаза выгрузки) - без полного просмотра набора
+                by_id = self._index(name, dataset)
+                dataset = [by_id[i] for i in sorted(filter.pop("id")) if i in by_id]
+            rows = [r for r in dataset if r["id"] > after and _matches(r, filter)]
+            page = rows[:limit]
+            data[alias] = [project(r, selection) for r in page]
+            page_info = {
+                "totalCount": len(rows),
+                "hasNextPage": len(rows) > limit,
+                "lastId": page[-1]["id"] if page else after
+            }
+        return {"data": data, "extensions": {"pageInfo": page_info}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if server.latency:
+                    threading.Event().wait(server.latency)
+                payload = json.dumps(server.resolve(body), ensure_ascii=False).encode("utf-8")
+                gzipped = server.compress and "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    payload = gzip.compress(payload, compresslevel=6)
+                server.requests += 1
+                server.bytes_sent += len(payload)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
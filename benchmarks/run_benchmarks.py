@@ -0,0 +1,140 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import benchmarks  # noqa: F401 - добавляет src/ в sys.path
+from benchmarks.synthetic import generate_contracts, generate_announcements, reference_datasets
+from benchmarks.mock_server import MockGraphQLServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BENCH_BIN = "000000000000"
+BENCH_YEAR = 2024
+
+def git_revision():
+    """Текущий коммит (для сравнения результатов между версиями)"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(func, repeat):
+    """Время выполнения func (секунды) по нескольким повторам; вывод в консоль подавляется"""
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "mean": statistics.mean(timings), "repeat": repeat}
+
+def run(scales, repeat, benchmarks_to_run, compress=False):
+    """Прогон набора бенчмарков на локальном сервере; результаты - список словарей"""
+    server = MockGraphQLServer([], [], references=reference_datasets(), compress=compress)
+    os.environ["BASE_URL"] = server.url
+    os.environ.setdefault("TOKEN", "benchmark")
+
+    # Импорт модулей проекта - после настройки окружения
+    with contextlib.redirect_stdout(io.StringIO()):
+        import cache
+        import fastjson
+        import generate_report
+        import get_contracts
+        from models import parse_contract
+    cache.set_mode(cache.MODE_OFF)
+
+    results = []
+    tmp_dir = tempfile.mkdtemp(prefix="goszakup_bench_")
+    with server:
+        for scale in scales:
+            contracts = generate_contracts(scale, BENCH_BIN, BENCH_YEAR)
+            records = [parse_contract(c) for c in contracts]
+            pages = [
+                json.dumps({"data": {"Contract": contracts[i:i + 200]}}, ensure_ascii=False).encode("utf-8")
+                for i in range(0, len(contracts), 200)
+            ]
+            announcements = generate_announcements(max(scale // 10, 1), BENCH_BIN, BENCH_YEAR)
+            server.datasets.update(Contract=contracts, TrdBuy=announcements)
+
+            cases = {
+                "fetch_report_contracts": lambda: generate_report.get_contracts_for_report(BENCH_BIN, BENCH_YEAR),
+                "fetch_register_contracts": lambda: get_contracts.get_contracts(BENCH_BIN, BENCH_YEAR),
+                "fetch_report_separate": lambda: generate_report.build_report(BENCH_BIN, BENCH_YEAR, None, os.path.join(tmp_dir, "report.xlsx"), batch=False),
+                "fetch_report_batched": lambda: generate_report.build_report(BENCH_BIN, BENCH_YEAR, None, os.path.join(tmp_dir, "report.xlsx"), batch=True),
+                "decode_json": lambda: [fastjson.loads(page) for page in pages],
+                "parse_contracts": lambda: [parse_contract(c) for c in contracts],
+                "aggregate_data": lambda: generate_report.aggregate_data(records),
+                "create_report": lambda: generate_report.create_report(records, os.path.join(tmp_dir, "report.xlsx")),
+                "save_to_excel": lambda: get_contracts.save_to_excel(records, os.path.join(tmp_dir, "register.xlsx")),
+            }
+            for name, func in cases.items():
+                if benchmarks_to_run and name not in benchmarks_to_run:
+                    continue
+                server.requests = server.bytes_sent = 0
+                timing = measure(func, repeat)
+                result = {
+                    "name": name,
+                    "scale": scale,
+                    "seconds_min": round(timing["min"], 4),
+                    "seconds_mean": round(timing["mean"], 4),
+                    "repeat": repeat,
+                    "rows_per_second": round(scale / timing["min"]) if timing["min"] else None
+                }
+                if name.startswith("fetch"):
+                    result["requests"] = server.requests // repeat
+                    result["response_bytes"] = server.bytes_sent // repeat
+                results.append(result)
+                print(f"{name:<26} {scale:>8} договоров: {timing['min']:.3f} с (среднее {timing['mean']:.3f} с)")
+    return results
+
+def compare(results, baseline_path):
+    """Сравнение с сохранённым прогоном: отношение времени (больше 1 - медленнее)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], r["scale"]): r for r in json.load(f)["results"]}
+    print(f"\nСравнение с {baseline_path}:")
+    for r in results:
+        base = baseline.get((r["name"], r["scale"]))
+        if base and base["seconds_min"]:
+            ratio = r["seconds_min"] / base["seconds_min"]
+            print(f"{r['name']:<26} {r['scale']:>8}: {base['seconds_min']:.3f} -> {r['seconds_min']:.3f} с (x{ratio:.2f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарки выгрузки и формирования отчётов")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1000, 10000, 100000], help="размеры наборов договоров")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов каждого замера")
+    parser.add_argument("--only", nargs="+", help="запустить только указанные бенчмарки")
+    parser.add_argument("--output", help="файл результатов JSON (по умолчанию benchmarks/results/bench_<время>.json)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--gzip", action="store_true", help="сжимать ответы сервера gzip (response_bytes - размер при передаче)")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat, args.only, args.gzip)
+    import fastjson
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "json_decoder": fastjson.name(),
+                "gzip": args.gzip,
+                "platform": platform.platform()
+            },
+            "results": results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,122 @@
+import random
+from datetime import date, timedelta
+
+# Справочники, близкие к реальным значениям портала
+CONTRACT_STATUSES = {
+    190: "Действует",
+    375: "Частично исполнен",
+    390: "Исполнен",
+    340: "Расторгнут в одностороннем порядке",
+    350: "Расторгнут по соглашению сторон"
+}
+STATUS_WEIGHTS = [25, 10, 55, 5, 5]
+
+TRADE_METHODS = {
+    1: "Открытый конкурс",
+    2: "Аукцион",
+    3: "Запрос ценовых предложений",
+    6: "Из одного источника по несостоявшимся закупкам",
+    7: "Из одного источника",
+    22: "Закупки, не подлежащие процедурам",
+    32: "Электронный магазин"
+}
+METHOD_WEIGHTS = [10, 5, 30, 10, 20, 15, 10]
+
+SUBJECT_TYPES = {1: "Товар", 2: "Работа", 3: "Услуга"}
+SUBJECT_WEIGHTS = [50, 15, 35]
+
+CONTRACT_TYPES = {1: "Основной договор", 2: "Дополнительное соглашение"}
+
+WORDS = ["поставка", "услуги", "ремонт", "оборудования", "канцелярских", "товаров", "обслуживание",
+         "здания", "программного", "обеспечения", "транспортных", "средств", "питания", "охраны"]
+
+def _description(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))).capitalize()
+
+def make_contract(rng, contract_id, customer_bin, fin_year):
+    """Один договор в формате ответа Contract (со вложенными справочниками и ContractUnits)"""
+    status_id = rng.choices(list(CONTRACT_STATUSES), STATUS_WEIGHTS)[0]
+    method_id = rng.choices(list(TRADE_METHODS), METHOD_WEIGHTS)[0]
+    subject_id = rng.choices(list(SUBJECT_TYPES), SUBJECT_WEIGHTS)[0]
+    type_id = 1 if rng.random() < 0.85 else 2
+    sign_date = date(fin_year, 1, 1) + timedelta(days=rng.randint(0, 364))
+
+    units = []
+    contract_sum = 0.0
+    for _ in range(rng.randint(1, 6)):
+        amount = round(rng.lognormvariate(13, 1.3), 2)
+        units.append({"Plans": {"amount": amount} if rng.random() < 0.95 else None})
+        contract_sum += amount * rng.uniform(0.85, 1.0)
+    contract_sum = round(contract_sum, 2)
+    fakt_sum = round(contract_sum * rng.uniform(0.9, 1.0), 2) if status_id in (375, 390) else 0
+
+    supplier_biin = f"{rng.randint(0, 10 ** 12 - 1):012d}"
+    return {
+        "id": contract_id,
+        "contractNumber": f"{contract_id:07d}-{fin_year % 100}",
+        "signDate": f"{sign_date.isoformat()} 00:00:00",
+        "contractSum": contract_sum,
+        "contractSumWnds": round(contract_sum * 1.12, 2),
+        "faktSum": fakt_sum,
+        "supplierBiin": supplier_biin,
+        "descriptionRu": _description(rng),
+        "finYear": fin_year,
+        "customerBin": customer_bin,
+        "refContractStatusId": status_id,
+        "refContractTypeId": type_id,
+        "refSubjectTypeId": subject_id,
+        "faktTradeMethodsId": method_id,
+        "Supplier": {"nameRu": f"ТОО \"Поставщик {supplier_biin[-4:]}\""},
+        "RefContractStatus": {"nameRu": CONTRACT_STATUSES[status_id]},
+        "RefSubjectType": {"nameRu": SUBJECT_TYPES[subject_id]},
+        "RefContractType": {"nameRu": CONTRACT_TYPES[type_id]},
+        "FaktTradeMethods": {"nameRu": TRADE_METHODS[method_id]},
+        "TrdBuy": {"numberAnno": f"{contract_id + 500000}-1"},
+        "ContractUnits": units
+    }
+
+def make_announcement(rng, announcement_id, customer_bin, fin_year):
+    """Одно объявление в формате ответа TrdBuy"""
+    method_id = rng.choices(list(TRADE_METHODS), METHOD_WEIGHTS)[0]
+    publish_date = date(fin_year, 1, 1) + timedelta(days=rng.randint(0, 364))
+    return {
+        "id": announcement_id,
+        "numberAnno": f"{announcement_id}-1",
+        "nameRu": _description(rng),
+        "publishDate": f"{publish_date.isoformat()} 10:00:00",
+        "totalSum": round(rng.lognormvariate(14, 1.2), 2),
+        "orgBin": customer_bin,
+        "refTradeMethodsId": method_id,
+        "RefTradeMethods": {"nameRu": TRADE_METHODS[method_id]}
+    }
+
+def reference_datasets():
+    """Справочники в формате ответов RefContractStatus/RefSubjectType/RefContractType/RefTradeMethods"""
+    def rows(names):
+        return [{"id": ref_id, "nameRu": name} for ref_id, name in sorted(names.items())]
+    return {
+        "RefContractStatus": rows(CONTRACT_STATUSES),
+        "RefSubjectType": rows(SUBJECT_TYPES),
+        "RefContractType": rows(CONTRACT_TYPES),
+        "RefTradeMethods": rows(TRADE_METHODS),
+    }
+
+def generate_contracts(count, customer_bin="000000000000", fin_year=2024, seed=1):
+    """Набор синтетических договоров с возрастающими id (как курсор API)"""
+    rng = random.Random(seed)
+    contract_id = 1000000
+    contracts = []
+    for _ in range(count):
+        contract_id += rng.randint(1, 5)
+        contracts.append(make_contract(rng, contract_id, customer_bin, fin_year))
+    return contracts
+
+def generate_announcements(count, customer_bin="000000000000", fin_year=2024, seed=2):
+    """Набор синтетических объявлений с возрастающими id"""
+    rng = random.Random(seed)
+    announcement_id = 9000000
+    announcements = []
+    for _ in range(count):
+        announcement_id += rng.randint(1, 5)
+        announcements.append(make_announcement(rng, announcement_id, customer_bin, fin_year))
+    return announcements
@@ -1,7 +1,105 @@
-import sys
+import argparse
 import os
+import sys
 
-def main():
+# Модули проекта лежат в src/ и импортируются как в самих скриптах
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+COMMANDS = ["contracts", "report", "announcements"]
+
+class Session:
+    """Данные, загруженные за время работы программы: повторные действия не обращаются к API"""
+
+    def __init__(self):
+        self.datasets = {}
+
+    def load(self, key, loader):
+        """Набор данных из сессии или загрузка при первом обращении"""
+        if key not in self.datasets:
+            self.datasets[key] = loader()
+        else:
+            print("Данные уже загружены в этой сессии.")
+        return self.datasets[key]
+
+    def contracts(self, bin_company, fin_year):
+        """Все договоры заказчика за год (записи реестра содержат и поля отчёта)"""
+        from get_contracts import get_contracts
+        return self.load(("contracts", bin_company, fin_year), lambda: get_contracts(bin_company, fin_year))
+
+    def announcements(self, bin_company, date_from, date_to):
+        """Объявления заказчика за период публикации"""
+        from get_announcements import ANNOUNCEMENT_FIELDS, iter_announcements
+        fields = ANNOUNCEMENT_FIELDS + ("publishDate",)
+        return self.load(("announcements", bin_company, date_from, date_to),
+                         lambda: list(iter_announcements(date_from, date_to, bin_company, fields)))
+
+def export_contracts(session, bin_company, fin_year):
+    """Реестр договоров заказчика в Excel"""
+    from config import report_path
+    from get_contracts import save_to_excel
+    contracts = session.contracts(bin_company, fin_year)
+    if contracts:
+        save_to_excel(contracts, report_path(f"contracts_{bin_company}_{fin_year}.xlsx"))
+        print(f"\nГотово! Найдено договоров: {len(contracts)}")
+    else:
+        print("Договоры не найдены.")
+
+def generate_reports(session, bin_company, fin_year, quarters):
+    """Аналитические отчёты за периоды из договоров и объявлений сессии (quarter None - год)"""
+    from config import CONTRACT_STATUSES, TERMINATED_STATUSES
+    from generate_report import aggregate_data, finish_report, get_quarter_dates, period_quarter
+    from get_announcements import count_by_method
+
+    contracts = session.contracts(bin_company, fin_year)
+    announcements = session.announcements(bin_company, *get_quarter_dates(fin_year, None))
+    for quarter in quarters:
+        in_period = [c for c in contracts if not quarter or period_quarter(c.sign_date, fin_year) == quarter]
+        date_from, date_to = get_quarter_dates(fin_year, quarter)
+        summary = finish_report(
+            aggregate_data(c for c in in_period if c.status_id in CONTRACT_STATUSES),
+            sum(1 for c in in_period if c.status_id in TERMINATED_STATUSES),
+            dict(count_by_method(a for a in announcements if a.publish_date and date_from <= a.publish_date <= date_to)),
+            bin_company, fin_year, quarter
+        )
+        period = f"{quarter} квартал" if quarter else "год"
+        print(f"{period}: договоров {summary['count']}, расторгнуто {summary['terminated']}, объявлений {summary['announcements']}")
+
+def show_announcements(session, bin_company, date_from, date_to):
+    """Сводка по объявлениям за период: в консоль и в Excel"""
+    from config import report_path
+    from get_announcements import count_by_method, save_to_excel
+    methods_count = count_by_method(session.announcements(bin_company, date_from, date_to))
+    total_count = sum(methods_count.values())
+    if not total_count:
+        print("Объявления не найдены.")
+        return
+
+    print("Способ закупки                                    | Кол-во")
+    print("-" * 60)
+    for method, count in sorted(methods_count.items(), key=lambda x: -x[1]):
+        print(f"{method[:48]:<48} | {count}")
+    print("-" * 60)
+    print(f"{'ИТОГО':<48} | {total_count}")
+    period = f"{date_from.replace('-', '')}_{date_to.replace('-', '')}"
+    save_to_excel(methods_count, total_count, report_path(f"announcements_{bin_company}_{period}.xlsx"),
+                  bin_company, date_from, date_to)
+
+def run_command(session, command, args):
+    """Выполнение одного действия в текущем процессе"""
+    import config
+    import metrics
+    with metrics.stage(command):
+        if command == "contracts":
+            export_contracts(session, args.bin, args.year)
+        elif command == "report":
+            quarters = [None, 1, 2, 3, 4] if args.all_periods else [args.quarter or None]
+            generate_reports(session, args.bin, args.year, quarters)
+        elif command == "announcements":
+            show_announcements(session, args.bin, config.DATE_FROM, config.DATE_TO)
+
+def menu(session, args):
+    """Интерактивное меню; загруженные данные переиспользуются между действиями"""
+    actions = {"1": "contracts", "2": "report", "3": "announcements"}
     while True:
         print("\n" + "="*30)
         print("=== Goszakup Аналитика ===")
@@ -9,24 +107,62 @@ def main():
         print("1. Выгрузить все договоры (get_contracts)")
         print("2. Сгенерировать аналитический отчет (generate_report)")
         print("3. Показать сводку по объявлениям (get_announcements)")
+        print("r. Сбросить загруженные данные")
         print("q. Выход")
-        
+
         choice = input("\nВыберите действие: ").strip().lower()
-        
-        if choice == '1':
-            print("\nЗапуск выгрузки договоров...")
-            os.system("python src/get_contracts.py")
-        elif choice == '2':
-            print("\nЗапуск генерации отчета...")
-            os.system("python src/generate_report.py")
-        elif choice == '3':
-            print("\nЗапуск сводки по объявлениям...")
-            os.system("python src/get_announcements.py")
+
+        if choice in actions:
+            try:
+                run_command(session, actions[choice], args)
+            except Exception as e:
+                print(f"Ошибка: {e}")
+        elif choice == 'r':
+            session.datasets.clear()
+            print("Данные сессии сброшены.")
         elif choice == 'q':
             print("Выход из программы.")
             break
         else:
             print("Неверный выбор. Пожалуйста, попробуйте еще раз.")
 
+def main():
+    import config
+    import cache
+    import checkpoint
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Goszakup Аналитика: выгрузки и отчёты в одном процессе")
+    parser.add_argument("commands", nargs="*", metavar="command",
+                        help=f"действия по порядку ({', '.join(COMMANDS)}); без команд - интерактивное меню")
+    parser.add_argument("--bin", default=config.BIN_COMPANY, help="БИН заказчика (по умолчанию BIN_COMPANY)")
+    parser.add_argument("--year", type=int, default=config.FIN_YEAR, help="финансовый год (по умолчанию FIN_YEAR)")
+    parser.add_argument("--quarter", type=int, choices=[0, 1, 2, 3, 4], default=config.QUARTER or 0,
+                        help="квартал отчёта, 0 - годовой (по умолчанию QUARTER)")
+    parser.add_argument("--all-periods", action="store_true", help="годовой и все квартальные отчёты")
+    cache.add_arguments(parser)
+    checkpoint.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    for command in args.commands:
+        if command not in COMMANDS:
+            parser.error(f"неизвестная команда {command!r} (доступны: {', '.join(COMMANDS)})")
+    try:
+        # Значения из командной строки становятся настройками процесса по умолчанию
+        config.override(bin_company=args.bin, fin_year=args.year, quarter=args.quarter or None)
+    except ValueError as e:
+        parser.error(str(e))
+    cache.configure(args)
+    checkpoint.configure(args)
+    metrics.configure(args)
+
+    session = Session()
+    if args.commands:
+        for command in args.commands:
+            run_command(session, command, args)
+    else:
+        menu(session, args)
+    metrics.finish()
+
 if __name__ == "__main__":
     main()
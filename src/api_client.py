@@ -0,0 +1,358 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+import config
+from config import PAGE_LIMIT, REQUEST_TIMEOUT, BACKOFF_BASE, BACKOFF_MAX
+import cache
+import checkpoint
+import fastjson
+import metrics
+
+# HTTP-статусы, после которых запрос повторяется; 429/503 - признак ограничения нагрузки
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+# Сетевые сбои, после которых запрос повторяется: в том числе обрыв соединения
+# посреди тела ответа и повреждённое сжатое тело
+RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+
+# Сжатие ответов: gzip/deflate, а также br/zstd, если установлены brotli/zstandard
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# Сессия, лимит запросов в секунду и число параллельных запросов создаются
+# при первом запросе к API (по настройкам на этот момент)
+_session = None
+_session_lock = threading.Lock()
+rate_limiter = None
+concurrency = None
+
+class RateLimiter:
+    """Общий для всех потоков лимит запросов в секунду (равномерные интервалы)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+class ApiError(Exception):
+    """Запрос к API не удался (после всех повторов) или вернул ошибки GraphQL"""
+
+class AdaptiveConcurrency:
+    """Число одновременных запросов по схеме AIMD
+
+    Каждый успешный запрос увеличивает лимит на 1/лимит (примерно +1 за «окно»),
+    ответ 429/503 уменьшает его вдвое. Лимит лежит в диапазоне [1, max_limit].
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max(1, max_limit)
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        with self.condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.condition.notify_all()
+
+    def on_throttle(self):
+        with self.condition:
+            self.limit = max(1.0, self.limit / 2)
+
+def get_session():
+    """Общая HTTP-сессия с пулом keep-alive соединений"""
+    global _session, rate_limiter, concurrency
+    with _session_lock:
+        if _session is not None:
+            return _session
+        settings = config.settings()
+        if not settings.token:
+            print("ВНИМАНИЕ: TOKEN не найден в переменном окружении или .env файле!")
+            print("Пожалуйста, скопируйте .env.example в .env и укажите ваш токен.")
+        rate_limiter = RateLimiter(settings.rate_limit)
+        concurrency = AdaptiveConcurrency(settings.max_parallel_requests)
+        session = requests.Session()
+        # Размер пула соединений (keep-alive) к ows.goszakup.gov.kz
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(10, settings.max_parallel_requests))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {settings.token}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING
+        })
+        _session = session
+        return _session
+
+def retry_delay(attempt, retry_after=None):
+    """Пауза перед повтором: экспонента с полным случайным разбросом, не меньше Retry-After"""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def parse_retry_after(value):
+    """Заголовок Retry-After (секунды или HTTP-дата) -> секунды"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def wire_bytes(response):
+    """Размер тела ответа при передаче (до распаковки gzip/br)"""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content)
+
+def post(query, variables, entity=None):
+    """HTTP-запрос к API с таймаутами, повторами и адаптивным числом параллельных запросов"""
+    payload = {"query": query, "variables": variables}
+    session = get_session()
+    settings = config.settings()
+    error = None
+    retry_after = None
+
+    for attempt in range(settings.max_retries + 1):
+        # В метриках каждая попытка - отдельный запрос; повтор отмечается единицей
+        retry = 1 if attempt else 0
+        if attempt:
+            time.sleep(retry_delay(attempt - 1, retry_after))
+            retry_after = None
+
+        rate_limiter.acquire()
+        with concurrency:
+            start = time.perf_counter()
+            try:
+                response = session.post(f"{settings.base_url}/v3/graphql", json=payload, timeout=REQUEST_TIMEOUT)
+            except RETRY_EXCEPTIONS as e:
+                error = f"{type(e).__name__}: {e}"
+                metrics.record_request(entity, time.perf_counter() - start, 0, 0, retry)
+                continue
+            latency = time.perf_counter() - start
+
+        if response.status_code in RETRY_STATUSES:
+            error = f"HTTP {response.status_code}"
+            if response.status_code in THROTTLE_STATUSES:
+                concurrency.on_throttle()
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            metrics.record_request(entity, latency, len(response.content), 0, retry, response.status_code)
+            continue
+        if response.status_code >= 400:
+            metrics.record_request(entity, latency, len(response.content), 0, retry, response.status_code)
+            raise ApiError(f"HTTP {response.status_code} ({entity}): {response.text[:500]}")
+
+        try:
+            data = fastjson.loads(response.content)
+        except ValueError:
+            error = f"некорректный JSON в ответе (HTTP {response.status_code})"
+            metrics.record_request(entity, latency, len(response.content), 0, retry, response.status_code)
+            continue
+        metrics.record_request(entity, latency, len(response.content), time.perf_counter() - start - latency, retry,
+                               response.status_code, wire_bytes(response), response.headers.get("Content-Encoding"))
+        concurrency.on_success()
+        return data
+
+    raise ApiError(f"Запрос к API ({entity}) не удался после {settings.max_retries + 1} попыток: {error}")
+
+def graphql(query, variables, entity=None, use_cache=True):
+    """Выполнение одного GraphQL-запроса через общую сессию (с локальным кэшем ответов)
+
+    use_cache=False - ответ всегда запрашивается у API (кэш только обновляется).
+    """
+    data = cache.get(entity, query, variables) if use_cache else None
+    if data is not None:
+        metrics.record_cache_hit(entity)
+        return data
+
+    data = post(query, variables, entity)
+
+    if "errors" not in data:
+        cache.put(entity, query, variables, data)
+    return data
+
+def selection_set(fields):
+    """Текст выборки GraphQL из объявленных полей: ("id", "Supplier.nameRu") -> "id Supplier { nameRu }"
+
+    Строка возвращается без изменений (готовая выборка).
+    """
+    if isinstance(fields, str):
+        return fields
+    tree = {}
+    for field in fields:
+        node = tree
+        for name in field.split("."):
+            node = node.setdefault(name, {})
+
+    def render(node):
+        return " ".join(f"{name} {{ {render(child)} }}" if child else name for name, child in node.items())
+
+    return render(tree)
+
+def build_query(entity, fields):
+    """Сборка текста запроса для сущности (Contract, TrdBuy, ...) с курсорной пагинацией"""
+    return f"""
+        query($limit: Int, $after: Int, $filter: {entity}FiltersInput!) {{
+            {entity}(limit: $limit, after: $after, filter: $filter) {{
+                {selection_set(fields)}
+            }}
+        }}
+    """
+
+def paginate(entity, filter, fields, after=0, use_cache=True):
+    """Постраничный обход сущности по курсору extensions.pageInfo.lastId (генератор страниц)
+
+    Каждая страница сохраняется в контрольную точку потока; с --resume сначала
+    отдаются страницы прерванного запуска, затем выгрузка продолжается с его курсора.
+    fields - кортеж полей через точку (см. selection_set) или готовая выборка;
+    use_cache=False - страницы не читаются из кэша ответов (см. graphql).
+    """
+    fields = selection_set(fields)
+    query = build_query(entity, fields)
+    spool = checkpoint.Spool(entity, filter, fields, after)
+
+    resumed = 0
+    has_next = True
+    for records, after, has_next in spool.replay():
+        if not resumed:
+            print(f"Продолжение выгрузки {entity} с сохранённой контрольной точки...")
+        resumed += 1
+        yield records
+
+    spool.start(keep=resumed > 0)
+    while has_next:
+        data = graphql(query, {"limit": PAGE_LIMIT, "after": after, "filter": filter}, entity, use_cache)
+
+        if "errors" in data:
+            raise ApiError(f"Ошибка API ({entity}): {data['errors']}")
+
+        records = (data.get("data") or {}).get(entity) or []
+        if not records:
+            break
+
+        page_info = data.get("extensions", {}).get("pageInfo", {})
+        has_next = page_info.get("hasNextPage", False)
+        after = page_info.get("lastId", 0)
+
+        metrics.record_page(entity, len(records))
+        spool.append(records, after, has_next)
+        yield records
+
+    spool.finalize()
+
+def build_batch_query(streams):
+    """Один запрос с несколькими корневыми полями под псевдонимами: {псевдоним: (сущность, поля)}"""
+    params = ["$limit: Int"]
+    roots = []
+    for alias, (entity, fields) in streams.items():
+        params.append(f"$after_{alias}: Int, $filter_{alias}: {entity}FiltersInput!")
+        roots.append(f"""
+            {alias}: {entity}(limit: $limit, after: $after_{alias}, filter: $filter_{alias}) {{
+                {selection_set(fields)}
+            }}""")
+    return f"""
+        query({", ".join(params)}) {{{"".join(roots)}
+        }}
+    """
+
+def paginate_batch(streams):
+    """Постраничный обход нескольких потоков одним HTTP-запросом на страницу (генератор (псевдоним, записи))
+
+    streams - {псевдоним: (сущность, фильтр, поля)}; поле id обязательно.
+    extensions.pageInfo в ответе одна на весь запрос, поэтому курсор каждого
+    псевдонима - id последней записи, а поток закончен, когда страница неполная.
+    Закончившиеся потоки в следующие запросы не включаются. Контрольные точки
+    общие с paginate: прерванный поток продолжается с --resume так же.
+    """
+    state = {}
+    for alias, (entity, filter, fields) in streams.items():
+        fields = selection_set(fields)
+        spool = checkpoint.Spool(entity, filter, fields)
+        after, has_next, resumed = 0, True, 0
+        for records, after, has_next in spool.replay():
+            if not resumed:
+                print(f"Продолжение выгрузки {entity} ({alias}) с сохранённой контрольной точки...")
+            resumed += 1
+            yield alias, records
+        spool.start(keep=resumed > 0)
+        if not has_next:
+            spool.finalize()
+        state[alias] = {"entity": entity, "filter": filter, "fields": fields, "spool": spool, "after": after, "has_next": has_next}
+
+    active = [alias for alias, s in state.items() if s["has_next"]]
+    while active:
+        query = build_batch_query({alias: (state[alias]["entity"], state[alias]["fields"]) for alias in active})
+        variables = {"limit": PAGE_LIMIT}
+        for alias in active:
+            variables[f"after_{alias}"] = state[alias]["after"]
+            variables[f"filter_{alias}"] = state[alias]["filter"]
+        entity = "+".join(sorted({state[alias]["entity"] for alias in active}))
+        data = graphql(query, variables, entity)
+
+        if "errors" in data:
+            raise ApiError(f"Ошибка API ({entity}): {data['errors']}")
+
+        for alias in active:
+            s = state[alias]
+            records = (data.get("data") or {}).get(alias) or []
+            if records:
+                s["after"] = records[-1]["id"]
+                s["has_next"] = len(records) >= PAGE_LIMIT
+                metrics.record_page(s["entity"], len(records))
+                s["spool"].append(records, s["after"], s["has_next"])
+                yield alias, records
+            else:
+                s["has_next"] = False
+            if not s["has_next"]:
+                s["spool"].finalize()
+        active = [alias for alias in active if state[alias]["has_next"]]
+
+def iter_records(entity, filter, fields, after=0, use_cache=True):
+    """Поэлементный обход сущности: в памяти держится не больше одной страницы"""
+    for records in paginate(entity, filter, fields, after, use_cache):
+        yield from records
+
+def run_parallel(tasks, max_workers=None):
+    """Параллельный запуск независимых выгрузок: {имя: функция} -> {имя: результат}"""
+    max_workers = max_workers or config.MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {name: executor.submit(task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
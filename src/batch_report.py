@@ -0,0 +1,152 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config
+from config import report_path
+import cache
+import checkpoint
+import metrics
+from generate_report import build_report, build_year_reports, report_filename, format_number
+
+def read_bins(path):
+    """Чтение списка БИН из файла (по одному в строке, # - комментарий)"""
+    bins = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                bins.append(line)
+    return bins
+
+def run_job(bin_company, fin_year, quarter):
+    """Формирование отчёта по одному заказчику; ошибка не прерывает пакет"""
+    try:
+        # Внутри задачи выгрузки идут последовательно: параллелизм - между заказчиками
+        return build_report(bin_company, fin_year, quarter, report_filename(fin_year, quarter, bin_company), max_workers=1)
+    except Exception as e:
+        return {"bin": bin_company, "fin_year": fin_year, "quarter": quarter, "error": str(e)}
+
+def run_year_job(bin_company, fin_year):
+    """Годовой и квартальные отчёты заказчика из одной выгрузки за год"""
+    try:
+        filenames = {q: report_filename(fin_year, q, bin_company) for q in (None, 1, 2, 3, 4)}
+        return build_year_reports(bin_company, fin_year, filenames, max_workers=1)
+    except Exception as e:
+        return [{"bin": bin_company, "fin_year": fin_year, "quarter": None, "error": str(e)}]
+
+def run_batch(bins, years, quarters, workers=None, all_periods=False):
+    """Пакетное формирование отчётов: все сочетания БИН x год x квартал в пуле потоков
+
+    all_periods - по каждой паре (БИН, год) все периоды из одной выгрузки (quarters не используется).
+    """
+    workers = workers or config.BATCH_WORKERS
+    if all_periods:
+        jobs = [(run_year_job, b, y) for b in bins for y in years]
+    else:
+        jobs = [(run_job, b, y, q) for b in bins for y in years for q in quarters]
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(*job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            for summary in result if isinstance(result, list) else [result]:
+                summaries.append(summary)
+                status = f"ошибка: {summary['error']}" if summary.get("error") else f"договоров {summary['count']}"
+                print(f"[{done}/{len(jobs)}] {summary['bin']} / {summary['fin_year']} / Q{summary['quarter'] or '-'}: {status}")
+    summaries.sort(key=lambda s: (s["bin"], s["fin_year"], s["quarter"] or 0))
+    return summaries
+
+def save_summary(summaries, filename):
+    """Сводная таблица по всем заказчикам пакета"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Сводка"
+
+    # Стили
+    font_bold = Font(name='Times New Roman', size=12, bold=True)
+    font_normal = Font(name='Times New Roman', size=12)
+    font_header = Font(name='Times New Roman', size=11, bold=True, color='FFFFFF')
+    alignment_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    alignment_left = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+
+    headers = ["№", "БИН заказчика", "Год", "Квартал", "Количество договоров", "Плановая сумма без НДС",
+               "Сумма договоров без НДС", "Фактическая сумма без НДС", "Экономия без НДС",
+               "Расторгнуто", "Объявлений", "Файл отчёта / ошибка"]
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = font_header
+        cell.alignment = alignment_center
+        cell.border = thin_border
+        cell.fill = header_fill
+    ws.row_dimensions[1].height = 45
+
+    for idx, s in enumerate(summaries, 1):
+        if s.get("error"):
+            values = [idx, s["bin"], s["fin_year"], s["quarter"] or "год", None, None, None, None, None, None, None, s["error"]]
+        else:
+            values = [
+                idx, s["bin"], s["fin_year"], s["quarter"] or "год", s["count"],
+                format_number(s["plan_sum"]), format_number(s["contract_sum"]), format_number(s["actual_sum"]),
+                format_number(s["plan_sum"] - s["actual_sum"]), s["terminated"], s["announcements"],
+                os.path.basename(s["filename"]) if s["filename"] else "нет договоров"
+            ]
+        for col, val in enumerate(values, 1):
+            cell = ws.cell(row=idx + 1, column=col, value=val)
+            cell.font = font_bold if s.get("error") and col == 12 else font_normal
+            cell.border = thin_border
+            cell.alignment = alignment_left if col == 12 else alignment_center
+            if col in [6, 7, 8, 9] and isinstance(val, (int, float)):
+                cell.number_format = '#,##0'
+
+    ws.cell(row=len(summaries) + 3, column=1, value="Суммы указаны в тыс. тенге")
+    ws.cell(row=len(summaries) + 3, column=1).font = Font(name='Times New Roman', size=10, italic=True)
+
+    for letter, width in zip("ABCDEFGHIJKL", [5, 16, 8, 9, 14, 18, 18, 18, 16, 12, 12, 45]):
+        ws.column_dimensions[letter].width = width
+
+    wb.save(filename)
+    print(f"Сводка сохранена: {filename}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетная генерация отчётов по списку заказчиков")
+    parser.add_argument("--bins", nargs="+", help="БИН заказчиков")
+    parser.add_argument("--bins-file", help="файл со списком БИН (по одному в строке)")
+    parser.add_argument("--years", nargs="+", type=int, default=[config.FIN_YEAR], help="финансовые годы (по умолчанию config.FIN_YEAR)")
+    parser.add_argument("--quarters", nargs="+", type=int, choices=[0, 1, 2, 3, 4], default=[0],
+                        help="кварталы, 0 - годовой отчёт (по умолчанию 0)")
+    parser.add_argument("--all-periods", action="store_true",
+                        help="годовой и все квартальные отчёты по каждому заказчику из одной выгрузки за год")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="число заказчиков, обрабатываемых одновременно")
+    cache.add_arguments(parser)
+    checkpoint.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure(args)
+    checkpoint.configure(args)
+    metrics.configure(args)
+
+    bins = list(args.bins or [])
+    if args.bins_file:
+        bins.extend(read_bins(args.bins_file))
+    if not bins:
+        bins = [config.BIN_COMPANY]
+    quarters = [q or None for q in args.quarters]
+
+    print(f"Пакетная генерация: {len(bins)} заказчиков, годы {args.years}, потоков {args.workers}")
+    summaries = run_batch(bins, args.years, quarters, args.workers, args.all_periods)
+
+    years = "_".join(str(y) for y in args.years)
+    save_summary(summaries, report_path(f"batch_summary_{years}.xlsx"))
+    errors = sum(1 for s in summaries if s.get("error"))
+    print(f"\nГотово! Отчётов: {len(summaries) - errors}, ошибок: {errors}")
+    metrics.finish()
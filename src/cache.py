@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import config
+import fastjson
+from config import CACHE_DIR, CACHE_TTL
+
+# Режимы кэша: "on" - читать и писать, "refresh" - только писать, "off" - не использовать
+MODE_ON = "on"
+MODE_REFRESH = "refresh"
+MODE_OFF = "off"
+
+# Доля CACHE_MAX_MB, до которой сокращается кэш при вытеснении (чтобы не вытеснять при каждой записи)
+EVICT_TARGET = 0.9
+
+_mode = MODE_ON
+_conn = None
+# Суммарный размер ответов в кэше: считается при открытии базы, дальше ведётся при записи
+_total_size = 0
+_lock = threading.Lock()
+
+def set_mode(mode):
+    """Установка режима работы кэша"""
+    global _mode
+    _mode = mode
+
+def add_arguments(parser):
+    """Добавление флагов --no-cache / --refresh в argparse"""
+    parser.add_argument("--no-cache", action="store_true", help="не использовать локальный кэш ответов API")
+    parser.add_argument("--refresh", action="store_true", help="загрузить данные заново и обновить кэш")
+
+def configure(args):
+    """Применение флагов командной строки к режиму кэша"""
+    if args.no_cache:
+        set_mode(MODE_OFF)
+    elif args.refresh:
+        set_mode(MODE_REFRESH)
+
+def _connect():
+    """Ленивое открытие базы кэша (одно соединение на процесс, доступ под блокировкой)"""
+    global _conn, _total_size
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _conn = sqlite3.connect(os.path.join(CACHE_DIR, "responses.sqlite"), check_same_thread=False)
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                entity TEXT,
+                created_at REAL,
+                size INTEGER,
+                body TEXT
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at)")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_amounts (
+                contract_id INTEGER PRIMARY KEY,
+                created_at REAL,
+                amount REAL
+            )
+        """)
+        _conn.commit()
+        _total_size = _conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    return _conn
+
+def make_key(query, variables):
+    """Ключ кэша: текст запроса + переменные (включая курсор страницы)"""
+    raw = json.dumps({"query": " ".join(query.split()), "variables": variables}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def get(entity, query, variables):
+    """Чтение ответа из кэша (None, если нет записи или истёк TTL)"""
+    if _mode != MODE_ON:
+        return None
+    ttl = CACHE_TTL.get(entity, CACHE_TTL["default"])
+    with _lock:
+        row = _connect().execute(
+            "SELECT created_at, body FROM responses WHERE key = ?", (make_key(query, variables),)
+        ).fetchone()
+    if row is None or time.time() - row[0] > ttl:
+        return None
+    return fastjson.loads(row[1])
+
+def put(entity, query, variables, data):
+    """Сохранение ответа в кэш с вытеснением старых записей при превышении размера"""
+    if _mode == MODE_OFF:
+        return
+    global _total_size
+    body = fastjson.dumps(data)
+    key = make_key(query, variables)
+    with _lock:
+        conn = _connect()
+        replaced = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, entity, created_at, size, body) VALUES (?, ?, ?, ?, ?)",
+            (key, entity, time.time(), len(body), body)
+        )
+        _total_size += len(body) - (replaced[0] if replaced else 0)
+        if _total_size > config.CACHE_MAX_MB * 1024 * 1024:
+            _evict(conn)
+        conn.commit()
+
+def _evict(conn):
+    """Удаление самых старых записей, пока размер кэша не опустится до EVICT_TARGET * CACHE_MAX_MB
+
+    Записи читаются пачками по индексу created_at; размер пересчитывается
+    полностью (его могли изменить другие процессы, пишущие в ту же базу).
+    """
+    global _total_size
+    _total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    target = config.CACHE_MAX_MB * 1024 * 1024 * EVICT_TARGET
+    while _total_size > target:
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY created_at LIMIT 100").fetchall()
+        if not rows:
+            break
+        for key, size in rows:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            _total_size -= size
+            if _total_size <= target:
+                break
+
+def get_plan_amounts(ids):
+    """Плановые суммы договоров из кэша: {id: сумма} для найденных и не истёкших записей"""
+    if _mode != MODE_ON or not ids:
+        return {}
+    since = time.time() - CACHE_TTL.get("Plans", CACHE_TTL["default"])
+    with _lock:
+        return dict(_connect().execute(
+            f"SELECT contract_id, amount FROM plan_amounts WHERE created_at >= ? AND contract_id IN ({', '.join('?' for _ in ids)})",
+            (since, *ids)
+        ).fetchall())
+
+def put_plan_amounts(amounts):
+    """Сохранение плановых сумм {id договора: сумма}"""
+    if _mode == MODE_OFF or not amounts:
+        return
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO plan_amounts (contract_id, created_at, amount) VALUES (?, ?, ?)",
+            [(contract_id, now, amount) for contract_id, amount in amounts.items()]
+        )
+        conn.commit()
@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+import fastjson
+from config import CHECKPOINT_DIR
+
+# Контрольные точки постраничной выгрузки: каждая полученная страница и следующий
+# курсор дописываются в файл потока. После обрыва запуск с --resume сначала отдаёт
+# сохранённые страницы, затем продолжает с последнего курсора. Файл удаляется,
+# когда поток выгружен полностью.
+
+_resume = False
+
+def set_resume(resume):
+    """Включение продолжения прерванных выгрузок"""
+    global _resume
+    _resume = resume
+
+def add_arguments(parser):
+    """Добавление флага --resume в argparse"""
+    parser.add_argument("--resume", action="store_true", help="продолжить прерванную выгрузку с последней сохранённой страницы")
+
+def configure(args):
+    """Применение флагов командной строки"""
+    set_resume(args.resume)
+
+def stream_key(entity, filter, fields, after):
+    """Идентификатор потока: сущность, фильтр, набор полей и начальный курсор"""
+    raw = json.dumps({"entity": entity, "filter": filter, "fields": " ".join(fields.split()), "after": after},
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+class Spool:
+    """Файл контрольной точки одного постраничного потока"""
+
+    def __init__(self, entity, filter, fields, after=0):
+        self.entity = entity
+        self.path = os.path.join(CHECKPOINT_DIR, f"{entity}_{stream_key(entity, filter, fields, after)}.jsonl")
+        self.file = None
+
+    def replay(self):
+        """Страницы прерванного запуска: (записи, следующий курсор, есть ли ещё страницы)"""
+        if not _resume or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    page = fastjson.loads(line)
+                except ValueError:
+                    # Последняя строка могла быть записана не полностью
+                    break
+                yield page["records"], page["next"], page["has_next"]
+
+    def start(self, keep):
+        """Открытие файла: дописывание после сохранённых страниц или новая запись"""
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        if keep:
+            # Отбрасываем недописанный хвост, чтобы новые страницы шли с новой строки
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                f.seek(data.rfind(b"\n") + 1)
+                f.truncate()
+        self.file = open(self.path, "a" if keep else "w", encoding="utf-8")
+
+    def append(self, records, next_after, has_next):
+        """Сохранение полученной страницы и следующего курсора"""
+        self.file.write(fastjson.dumps({"next": next_after, "has_next": has_next, "records": records}))
+        self.file.write("\n")
+        self.file.flush()
+
+    def finalize(self):
+        """Поток выгружен полностью - контрольная точка больше не нужна"""
+        if self.file:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
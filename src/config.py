@@ -1,43 +1,52 @@
 import os
-from dotenv import load_dotenv
+import re
+import threading
+from dataclasses import dataclass, replace
 
-# Загружаем переменные из .env
-load_dotenv()
+# Импорт модуля не имеет побочных эффектов: .env читается, а настройки проверяются
+# при первом обращении к ним (config.BIN_COMPANY, config.settings()).
 
 # Пути проекта
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-REPORTS_DIR = os.path.join(BASE_DIR, \"reports\")
-
-# Создаем папку для отчетов, если её нет
-if not os.path.exists(REPORTS_DIR):
-    os.makedirs(REPORTS_DIR)
+REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 
 # === КОНФИГУРАЦИЯ API ===
 
-# Токен авторизации (получите на портале goszakup.gov.kz)
-TOKEN = os.getenv(\"TOKEN\")
+# Лимит записей на страницу (макс 200)
+PAGE_LIMIT = 200
 
-if not TOKEN:
-    print(\"ВНИМАНИЕ: TOKEN не найден в переменном окружении или .env файле!\")
-    print(\"Пожалуйста, скопируйте .env.example в .env и укажите ваш токен.\")
+# Таймауты HTTP-запроса к API (подключение, чтение), секунды
+REQUEST_TIMEOUT = (10, 120)
 
-# Базовый URL API
-BASE_URL = \"https://ows.goszakup.gov.kz\"
+# Пауза перед повтором: экспоненциальный рост от BACKOFF_BASE до BACKOFF_MAX секунд (со случайным разбросом)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
 
-# Лимит записей на страницу (макс 200)
-PAGE_LIMIT = 200
+# === ЛОКАЛЬНЫЙ КЭШ ОТВЕТОВ API ===
+
+# Папка с базой кэша
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
 
-# === ПАРАМЕТРЫ ПОИСКА ===
+# Время жизни записей кэша по сущностям (секунды)
+CACHE_TTL = {
+    "Contract": 6 * 3600,
+    "TrdBuy": 6 * 3600,
+    "References": 7 * 24 * 3600,
+    "Plans": 6 * 3600,
+    "default": 3600
+}
 
-# БИН заказчика
-BIN_COMPANY = os.getenv(\"BIN_COMPANY\", \"020240003361\")
+# Папка контрольных точек постраничной выгрузки (для --resume)
+CHECKPOINT_DIR = os.path.join(BASE_DIR, "cache", "checkpoints")
 
-# Финансовый год
-FIN_YEAR = int(os.getenv(\"FIN_YEAR\", 2024))
+# === ЛОКАЛЬНОЕ ХРАНИЛИЩЕ ДОГОВОРОВ ===
 
-# Квартал (1-4, или None для годового отчета)
-_quarter = os.getenv(\"QUARTER\")
-QUARTER = int(_quarter) if _quarter and _quarter.isdigit() and 1 <= int(_quarter) <= 4 else None
+# Папка с базой синхронизированных договоров
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# Статусы, которые ещё могут измениться и перепроверяются при синхронизации
+# 190 = Действует, 375 = Частично исполнен
+OPEN_STATUSES = [190, 375]
 
 # === ПАРАМЕТРЫ ОТЧЁТА ===
 
@@ -52,8 +61,136 @@ TERMINATED_STATUSES = [340, 350]
 # Тип договора: 1 - основной, 2 - допик (включаем оба)
 CONTRACT_TYPES = [1, 2]
 
-# === ПАРАМЕТРЫ ОТЧЁТА ПО ОБЪЯВЛЕНИЯМ ===
-
-# Период для отчёта по объявлениям (формат: ГГГГ-ММ-ДД)
-DATE_FROM = os.getenv(\"DATE_FROM\", \"2024-01-01\")
-DATE_TO = os.getenv(\"DATE_TO\", \"2024-12-31\")
+# === НАСТРОЙКИ ИЗ ОКРУЖЕНИЯ И .env ===
+
+@dataclass(frozen=True)
+class Settings:
+    """Настройки из переменных окружения (проверяются при создании и при override)"""
+
+    # Токен авторизации (получите на портале goszakup.gov.kz)
+    token: str = None
+    # Базовый URL API (переопределяется, например, для локального тестового сервера)
+    base_url: str = "https://ows.goszakup.gov.kz"
+    # Максимальное число одновременно выполняемых потоков выгрузки
+    max_workers: int = 3
+    # Число повторов запроса при таймаутах, 429/5xx и некорректных ответах
+    max_retries: int = 6
+    # Верхняя граница одновременных запросов к API; фактическое значение
+    # подстраивается автоматически (уменьшается при ограничениях со стороны портала)
+    max_parallel_requests: int = 8
+    # Общий лимит запросов к API в секунду на процесс (0 - без ограничения)
+    rate_limit: float = 0.0
+    # Число заказчиков, обрабатываемых одновременно в пакетном режиме
+    batch_workers: int = 4
+    # Объединение выгрузок отчёта в один GraphQL-запрос на страницу (псевдонимы корневых полей);
+    # False - отдельные параллельные запросы по каждой выгрузке
+    alias_batching: bool = True
+    # Максимальный размер кэша (МБ), при превышении удаляются самые старые записи
+    cache_max_mb: int = 500
+    # Библиотека разбора JSON: auto (orjson или msgspec, если установлены), orjson, msgspec, json
+    json_decoder: str = "auto"
+    # БИН заказчика
+    bin_company: str = "020240003361"
+    # Финансовый год
+    fin_year: int = 2024
+    # Квартал (1-4, или None для годового отчета)
+    quarter: int = None
+    # Период для отчёта по объявлениям (формат: ГГГГ-ММ-ДД)
+    date_from: str = "2024-01-01"
+    date_to: str = "2024-12-31"
+
+    def __post_init__(self):
+        errors = []
+        if not re.fullmatch(r"\d{12}", str(self.bin_company)):
+            errors.append(f"BIN_COMPANY должен состоять из 12 цифр: {self.bin_company!r}")
+        if not 2000 <= self.fin_year <= 2100:
+            errors.append(f"FIN_YEAR вне допустимого диапазона: {self.fin_year}")
+        if self.quarter is not None and self.quarter not in (1, 2, 3, 4):
+            errors.append(f"QUARTER должен быть от 1 до 4: {self.quarter}")
+        for name in ("date_from", "date_to"):
+            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", str(getattr(self, name))):
+                errors.append(f"{name.upper()} должен быть в формате ГГГГ-ММ-ДД: {getattr(self, name)!r}")
+        if str(self.date_from) > str(self.date_to):
+            errors.append(f"DATE_FROM позже DATE_TO: {self.date_from} > {self.date_to}")
+        for name in ("max_workers", "max_parallel_requests", "batch_workers", "cache_max_mb"):
+            if getattr(self, name) < 1:
+                errors.append(f"{name.upper()} должен быть не меньше 1: {getattr(self, name)}")
+        if self.json_decoder not in ("auto", "orjson", "msgspec", "json"):
+            errors.append(f"JSON_DECODER должен быть auto, orjson, msgspec или json: {self.json_decoder!r}")
+        if self.max_retries < 0 or self.rate_limit < 0:
+            errors.append("MAX_RETRIES и RATE_LIMIT не могут быть отрицательными")
+        if errors:
+            raise ValueError("Некорректные настройки: " + "; ".join(errors))
+
+def _flag(value):
+    """Логическое значение из окружения: 1/true/yes/on или 0/false/no/off (иначе ValueError)"""
+    value = value.lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(value)
+
+# Переменные окружения -> преобразование значения (поле Settings - имя в нижнем регистре)
+ENV_SETTINGS = {
+    "TOKEN": str,
+    "BASE_URL": str,
+    "MAX_WORKERS": int,
+    "MAX_RETRIES": int,
+    "MAX_PARALLEL_REQUESTS": int,
+    "RATE_LIMIT": float,
+    "BATCH_WORKERS": int,
+    "ALIAS_BATCHING": _flag,
+    "CACHE_MAX_MB": int,
+    "JSON_DECODER": str,
+    "BIN_COMPANY": str,
+    "FIN_YEAR": int,
+    "QUARTER": lambda value: int(value) or None,
+    "DATE_FROM": str,
+    "DATE_TO": str,
+}
+
+_settings = None
+_lock = threading.Lock()
+
+def load_settings():
+    """Чтение настроек из .env и переменных окружения"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    values = {}
+    for name, convert in ENV_SETTINGS.items():
+        raw = os.getenv(name)
+        if raw is None or raw.strip() == "":
+            continue
+        try:
+            values[name.lower()] = convert(raw.strip())
+        except ValueError:
+            raise ValueError(f"Некорректное значение {name}={raw!r} в окружении или .env") from None
+    return Settings(**values)
+
+def settings():
+    """Текущие настройки (читаются и проверяются один раз, при первом обращении)"""
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = load_settings()
+        return _settings
+
+def override(**values):
+    """Переопределение настроек в текущем процессе: override(bin_company=..., fin_year=...)"""
+    global _settings
+    current = settings()
+    with _lock:
+        _settings = replace(current, **values)
+        return _settings
+
+def __getattr__(name):
+    """Настройки доступны как константы модуля: config.BIN_COMPANY, config.FIN_YEAR, ..."""
+    if name in ENV_SETTINGS:
+        return getattr(settings(), name.lower())
+    raise AttributeError(f"module 'config' has no attribute {name!r}")
+
+def report_path(filename):
+    """Путь к файлу в REPORTS_DIR (папка создаётся при первой записи)"""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    return os.path.join(REPORTS_DIR, filename)
@@ -0,0 +1,98 @@
+import argparse
+import os
+import config
+from config import REPORTS_DIR
+import cache
+from api_client import iter_records
+from get_contracts import REGISTER_COLUMNS, iter_contracts, iter_register_rows
+from models import parse_announcement
+
+# Корневая папка Parquet-выгрузок (секционирование в стиле Hive: поле=значение)
+PARQUET_DIR = os.path.join(REPORTS_DIR, "parquet")
+
+# Колонки с малым числом различных значений - хранятся со словарным кодированием
+CONTRACT_CATEGORY_COLUMNS = [
+    "Вид предмета",
+    "Тип договора",
+    "Статус",
+    "Фактический способ закупки",
+    "Наименование поставщика"
+]
+
+# Поля объявления для выгрузки
+ANNOUNCEMENT_FIELDS = (
+    "id",
+    "numberAnno",
+    "nameRu",
+    "publishDate",
+    "totalSum",
+    "refTradeMethodsId",
+)
+
+ANNOUNCEMENT_COLUMNS = [
+    "ID объявления",
+    "Номер объявления",
+    "Наименование",
+    "Дата публикации",
+    "Сумма закупки",
+    "Способ закупки"
+]
+
+def iter_announcement_rows(announcements):
+    """Строки выгрузки объявлений из записей Announcement (словари в порядке ANNOUNCEMENT_COLUMNS)"""
+    for a in announcements:
+        yield {
+            "ID объявления": a.id,
+            "Номер объявления": a.number_anno,
+            "Наименование": a.name,
+            "Дата публикации": a.publish_date,
+            "Сумма закупки": a.total_sum,
+            "Способ закупки": a.trade_method or "Не указан",
+        }
+
+def write_partition(df, dataset, bin_company, fin_year):
+    """Запись одной секции dataset/customerBin=.../finYear=.../data.parquet"""
+    path = os.path.join(PARQUET_DIR, dataset, f"customerBin={bin_company}", f"finYear={fin_year}")
+    os.makedirs(path, exist_ok=True)
+    filename = os.path.join(path, "data.parquet")
+    df.to_parquet(filename, index=False, compression="zstd")
+    return filename
+
+def export_contracts(bin_company, fin_year, contracts=None):
+    """Выгрузка реестра договоров (БИН, год) в Parquet"""
+    import pandas as pd
+
+    if contracts is None:
+        contracts = iter_contracts(bin_company, fin_year)
+    df = pd.DataFrame(iter_register_rows(contracts), columns=REGISTER_COLUMNS)
+    for column in CONTRACT_CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    return write_partition(df, "contracts", bin_company, fin_year), len(df)
+
+def export_announcements(bin_company, fin_year):
+    """Выгрузка объявлений заказчика, опубликованных в финансовом году, в Parquet"""
+    import pandas as pd
+
+    filter = {
+        "orgBin": bin_company,
+        "publishDate": [f"{fin_year}-01-01", f"{fin_year}-12-31"]
+    }
+    announcements = map(parse_announcement, iter_records("TrdBuy", filter, ANNOUNCEMENT_FIELDS))
+    df = pd.DataFrame(iter_announcement_rows(announcements), columns=ANNOUNCEMENT_COLUMNS)
+    df["Способ закупки"] = df["Способ закупки"].astype("category")
+    return write_partition(df, "announcements", bin_company, fin_year), len(df)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Выгрузка договоров и объявлений в Parquet")
+    parser.add_argument("--bin", nargs="+", default=[config.BIN_COMPANY], help="БИН заказчиков (по умолчанию config.BIN_COMPANY)")
+    parser.add_argument("--year", nargs="+", type=int, default=[config.FIN_YEAR], help="финансовые годы (по умолчанию config.FIN_YEAR)")
+    cache.add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure(args)
+
+    for bin_company in args.bin:
+        for fin_year in args.year:
+            filename, count = export_contracts(bin_company, fin_year)
+            print(f"Договоры: {count} -> {filename}")
+            filename, count = export_announcements(bin_company, fin_year)
+            print(f"Объявления: {count} -> {filename}")
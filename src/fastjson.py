@@ -0,0 +1,63 @@
+import json
+import threading
+import config
+
+# Разбор и сериализация JSON для ответов API, кэша и контрольных точек.
+# JSON_DECODER=auto выбирает orjson или msgspec, если пакет установлен,
+# иначе стандартный json; можно указать библиотеку явно.
+
+DECODERS = ("orjson", "msgspec", "json")
+
+_backend = None
+_lock = threading.Lock()
+
+def _stdlib():
+    return "json", json.loads, lambda obj: json.dumps(obj, ensure_ascii=False)
+
+def _orjson():
+    import orjson
+    return "orjson", orjson.loads, lambda obj: orjson.dumps(obj).decode("utf-8")
+
+def _msgspec():
+    import msgspec
+    decoder, encoder = msgspec.json.Decoder(), msgspec.json.Encoder()
+
+    def loads(data):
+        # Ошибка разбора - ValueError, как у json и orjson
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None
+
+    return "msgspec", loads, lambda obj: encoder.encode(obj).decode("utf-8")
+
+BACKENDS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+def backend():
+    """(имя, loads, dumps) выбранной библиотеки (определяется при первом обращении)"""
+    global _backend
+    with _lock:
+        if _backend is None:
+            choice = config.JSON_DECODER
+            for name in DECODERS if choice == "auto" else (choice,):
+                try:
+                    _backend = BACKENDS[name]()
+                    break
+                except ImportError:
+                    if choice != "auto":
+                        print(f"ВНИМАНИЕ: пакет {name} не установлен, используется стандартный json")
+            else:
+                _backend = _stdlib()
+        return _backend
+
+def name():
+    """Имя используемой библиотеки JSON"""
+    return backend()[0]
+
+def loads(data):
+    """Разбор JSON из str или bytes"""
+    return backend()[1](data)
+
+def dumps(obj):
+    """Сериализация в str (UTF-8 без экранирования кириллицы)"""
+    return backend()[2](obj)
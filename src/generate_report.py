@@ -1,302 +1,217 @@
-import requests
-import os
+import argparse
+from array import array
 from collections import defaultdict
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from config import TOKEN, BASE_URL, PAGE_LIMIT, BIN_COMPANY, FIN_YEAR, CONTRACT_STATUSES, CONTRACT_TYPES, TERMINATED_STATUSES, DATE_FROM, DATE_TO, REPORTS_DIR, QUARTER
+import config
+from config import CONTRACT_STATUSES, CONTRACT_TYPES, TERMINATED_STATUSES, report_path
+import cache
+import checkpoint
+import metrics
+from api_client import paginate, paginate_batch, iter_records, run_parallel
+from models import parse_contract, parse_announcement
+from plans import PlanLoader, with_plan_amounts
+
+# Поля, которые использует каждая выгрузка отчёта (запрашиваются только они;
+# справочники - по id, названия берутся из локальной копии, см. references.py;
+# плановые суммы договоров - второй фазой, см. plans.py)
+REPORT_CONTRACT_FIELDS = (
+    "id",
+    "signDate",
+    "contractSum",
+    "faktSum",
+    "refSubjectTypeId",
+    "faktTradeMethodsId",
+)
+TERMINATED_FIELDS = ("id",)
+ANNOUNCEMENT_SUMMARY_FIELDS = ("id", "refTradeMethodsId")
 
 def get_quarter_dates(year, quarter):
-    \"\"\"Получение дат начала и конца квартала\"\"\"
+    """Получение дат начала и конца квартала"""
     if not quarter:
-        return f\"{year}-01-01\", f\"{year}-12-31\"
+        return f"{year}-01-01", f"{year}-12-31"
     
     quarter_ranges = {
-        1: (f\"{year}-01-01\", f\"{year}-03-31\"),
-        2: (f\"{year}-04-01\", f\"{year}-06-30\"),
-        3: (f\"{year}-07-01\", f\"{year}-09-30\"),
-        4: (f\"{year}-10-01\", f\"{year}-12-31\")
+        1: (f"{year}-01-01", f"{year}-03-31"),
+        2: (f"{year}-04-01", f"{year}-06-30"),
+        3: (f"{year}-07-01", f"{year}-09-30"),
+        4: (f"{year}-10-01", f"{year}-12-31")
     }
-    return quarter_ranges.get(quarter, (f\"{year}-01-01\", f\"{year}-12-31\"))
-
-def get_contracts_for_report():
-    \"\"\"Получение договоров для отчёта\"\"\"
-    
-    headers = {
-        \"Authorization\": f\"Bearer {TOKEN}\",
-        \"Content-Type\": \"application/json\"
+    return quarter_ranges.get(quarter, (f"{year}-01-01", f"{year}-12-31"))
+
+def contracts_filter(bin_company, fin_year, quarter, statuses):
+    """Фильтр договоров заказчика по статусам (квартал - по дате подписания на стороне API)"""
+    filter = {
+        "customerBin": bin_company,
+        "finYear": fin_year,
+        "refContractStatusId": statuses
     }
-    
-    all_contracts = []
-    after = 0
-    
-    while True:
-        query = {
-            \"query\": \"\"\"
-                query($limit: Int, $after: Int, $filter: ContractFiltersInput!) {
-                    Contract(limit: $limit, after: $after, filter: $filter) {
-                        id
-                        contractNumber
-                        contractSum
-                        contractSumWnds
-                        faktSum
-                        finYear
-                        signDate
-                        refContractStatusId
-                        refContractTypeId
-                        Supplier {
-                            nameRu
-                        }
-                        RefContractStatus {
-                            nameRu
-                        }
-                        RefSubjectType {
-                            nameRu
-                        }
-                        FaktTradeMethods {
-                            nameRu
-                        }
-                        ContractUnits {
-                            Plans {
-                                amount
-                            }
-                        }
-                    }
-                }
-            \"\"\",
-            \"variables\": {
-                \"limit\": PAGE_LIMIT,
-                \"after\": after,
-                \"filter\": {
-                    \"customerBin\": BIN_COMPANY,
-                    \"finYear\": FIN_YEAR,
-                    \"refContractStatusId\": CONTRACT_STATUSES
-                }
-            }
-        }
-        
-        response = requests.post(f\"{BASE_URL}/v3/graphql\", json=query, headers=headers)
-        data = response.json()
-        
-        if \"errors\" in data:
-            print(f\"Ошибка API: {data['errors']}\")
-            break
-        
-        contracts = data.get(\"data\", {}).get(\"Contract\", [])
-        if not contracts:
-            break
-            
-        all_contracts.extend(contracts)
-        
-        page_info = data.get(\"extensions\", {}).get(\"pageInfo\", {})
-        if not page_info.get(\"hasNextPage\", False):
-            break
-        after = page_info.get(\"lastId\", 0)
-        
-        print(f\"Загружено: {len(all_contracts)} договоров...\")
-    
-    return all_contracts
-
-def get_terminated_contracts_count(quarter=None):
-    \"\"\"Получение количества расторгнутых договоров (с фильтрацией по кварталу)\"\"\"
-
-    headers = {
-        \"Authorization\": f\"Bearer {TOKEN}\",
-        \"Content-Type\": \"application/json\"
+    if quarter:
+        filter["signDate"] = list(get_quarter_dates(fin_year, quarter))
+    return filter
+
+def announcements_filter(date_from, date_to, bin_company):
+    """Фильтр объявлений заказчика за период публикации"""
+    return {
+        "orgBin": bin_company,
+        "publishDate": [date_from, date_to]
     }
 
-    all_terminated = []
-    after = 0
-
-    while True:
-        query = {
-            \"query\": \"\"\"
-                query($limit: Int, $after: Int, $filter: ContractFiltersInput!) {
-                    Contract(limit: $limit, after: $after, filter: $filter) {
-                        id
-                        signDate
-                    }
-                }
-            \"\"\",
-            \"variables\": {
-                \"limit\": PAGE_LIMIT,
-                \"after\": after,
-                \"filter\": {
-                    \"customerBin\": BIN_COMPANY,
-                    \"finYear\": FIN_YEAR,
-                    \"refContractStatusId\": TERMINATED_STATUSES
-                }
-            }
-        }
+def iter_contracts_for_report(bin_company=None, fin_year=None, quarter=None):
+    """Потоковое получение договоров для отчёта (генератор записей Contract, период - на стороне API)"""
+    
+    bin_company = bin_company or config.BIN_COMPANY
+    fin_year = fin_year or config.FIN_YEAR
+    filter = contracts_filter(bin_company, fin_year, quarter, CONTRACT_STATUSES)
+    
+    pages = (list(map(parse_contract, contracts)) for contracts in paginate("Contract", filter, REPORT_CONTRACT_FIELDS))
+    loaded = 0
+    for contracts in with_plan_amounts(pages):
+        yield from contracts
+        loaded += len(contracts)
+        print(f"Загружено: {loaded} договоров...")
 
-        response = requests.post(f\"{BASE_URL}/v3/graphql\", json=query, headers=headers)
-        data = response.json()
+def get_contracts_for_report(bin_company=None, fin_year=None, quarter=None):
+    """Получение договоров для отчёта"""
+    return list(iter_contracts_for_report(bin_company, fin_year, quarter))
 
-        if \"errors\" in data:
-            print(f\"Ошибка API: {data['errors']}\")
-            break
+def get_terminated_contracts_count(quarter=None, bin_company=None, fin_year=None):
+    """Получение количества расторгнутых договоров (квартал фильтруется на стороне API)"""
 
-        contracts = data.get(\"data\", {}).get(\"Contract\", [])
-        if not contracts:
-            break
-            
-        all_terminated.extend(contracts)
+    bin_company = bin_company or config.BIN_COMPANY
+    fin_year = fin_year or config.FIN_YEAR
+    filter = contracts_filter(bin_company, fin_year, quarter, TERMINATED_STATUSES)
 
-        page_info = data.get(\"extensions\", {}).get(\"pageInfo\", {})
-        if not page_info.get(\"hasNextPage\", False):
-            break
-        after = page_info.get(\"lastId\", 0)
+    return sum(1 for _ in iter_records("Contract", filter, TERMINATED_FIELDS))
 
-    # Фильтруем по кварталу
-    if quarter:
-        all_terminated = filter_by_quarter(all_terminated, quarter)
-    
-    return len(all_terminated)
+def get_announcements_by_method(date_from, date_to, bin_company=None):
+    """Получение объявлений и группировка по способам закупки"""
 
-def get_announcements_by_method(date_from, date_to):
-    \"\"\"Получение объявлений и группировка по способам закупки\"\"\"
-
-    headers = {
-        \"Authorization\": f\"Bearer {TOKEN}\",
-        \"Content-Type\": \"application/json\"
-    }
+    filter = announcements_filter(date_from, date_to, bin_company or config.BIN_COMPANY)
 
     methods_count = defaultdict(int)
-    after = 0
-
-    while True:
-        query = {
-            \"query\": \"\"\"
-                query($limit: Int, $after: Int, $filter: TrdBuyFiltersInput!) {
-                    TrdBuy(limit: $limit, after: $after, filter: $filter) {
-                        id
-                        RefTradeMethods {
-                            nameRu
-                        }
-                    }
-                }
-            \"\"\",
-            \"variables\": {
-                \"limit\": PAGE_LIMIT,
-                \"after\": after,
-                \"filter\": {
-                    \"orgBin\": BIN_COMPANY,
-                    \"publishDate\": [date_from, date_to]
-                }
-            }
-        }
-
-        response = requests.post(f\"{BASE_URL}/v3/graphql\", json=query, headers=headers)
-        data = response.json()
+    for a in map(parse_announcement, iter_records("TrdBuy", filter, ANNOUNCEMENT_SUMMARY_FIELDS)):
+        methods_count[a.trade_method or "Не указан"] += 1
 
-        if \"errors\" in data:
-            print(f\"Ошибка API (объявления): {data['errors']}\")
-            break
-
-        announcements = data.get(\"data\", {}).get(\"TrdBuy\", [])
-        if not announcements:
-            break
+    return dict(methods_count)
 
-        for a in announcements:
-            method = a.get(\"RefTradeMethods\", {}).get(\"nameRu\") if a.get(\"RefTradeMethods\") else \"Не указан\"
-            methods_count[method] += 1
+def flatten_contracts(contracts):
+    """Преобразование записей Contract в колоночную таблицу (один проход)"""
+    import numpy as np
+    import pandas as pd
 
-        page_info = data.get(\"extensions\", {}).get(\"pageInfo\", {})
-        if not page_info.get(\"hasNextPage\", False):
-            break
-        after = page_info.get(\"lastId\", 0)
+    methods = []
+    subject_types = []
+    contract_sums = array("d")
+    fakt_sums = array("d")
+    plan_sums = array("d")
 
-    return dict(methods_count)
-
-def get_plan_amount(contract):
-    \"\"\"Получение плановой суммы из пунктов плана\"\"\"
-    units = contract.get(\"ContractUnits\", [])
-    if not units:
-        return 0
-    total = 0
-    for unit in units:
-        plans = unit.get(\"Plans\")
-        if plans and plans.get(\"amount\"):
-            total += plans.get(\"amount\", 0)
-    return total
-
-def filter_by_quarter(contracts, quarter):
-    \"\"\"Фильтрация договоров по кварталу (по дате подписания)\"\"\"
-    if not quarter:
-        return contracts
-    
-    quarter_months = {
-        1: (1, 2, 3),
-        2: (4, 5, 6),
-        3: (7, 8, 9),
-        4: (10, 11, 12)
-    }
-    months = quarter_ranges.get(quarter, ())
-    
-    filtered = []
     for c in contracts:
-        sign_date = c.get(\"signDate\")
-        if sign_date:
-            month = int(sign_date[5:7])  # \"2024-03-15\" -> 3
-            if month in months:
-                filtered.append(c)
-    return filtered
-
-def aggregate_data(contracts):
-    \"\"\"Агрегация данных по способам закупки и видам предмета\"\"\"
+        methods.append(c.trade_method or "Не указан")
+        subject_types.append(c.subject_type or "Не указан")
+        contract_sums.append(c.contract_sum or 0.0)
+        fakt_sums.append(c.fakt_sum or 0.0)
+        plan_sums.append(c.plan_amount)
+
+    return pd.DataFrame({
+        "method": pd.Categorical(methods),
+        "subject_type": pd.Categorical(subject_types),
+        "contract_sum": np.frombuffer(contract_sums, dtype=np.float64),
+        "fakt_sum": np.frombuffer(fakt_sums, dtype=np.float64),
+        "plan_sum": np.frombuffer(plan_sums, dtype=np.float64),
+    })
+
+def aggregate_frame(df):
+    """Агрегация колоночной таблицы договоров: таблицы 1 и 2, итоги по видам и общие итоги
+
+    Группы упорядочены по первому появлению, как в исходном списке договоров.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Коды групп в порядке первого появления
+    method_codes, method_uniques = pd.factorize(df["method"].cat.codes)
+    type_codes, type_uniques = pd.factorize(df["subject_type"].cat.codes)
+    methods = df["method"].cat.categories[method_uniques].tolist()
+    subject_types = df["subject_type"].cat.categories[type_uniques].tolist()
+    n_methods, n_types = len(methods), len(subject_types)
+
+    contract_sum = df["contract_sum"].to_numpy()
+    plan_sum = df["plan_sum"].to_numpy()
+    fakt_sum = df["fakt_sum"].to_numpy()
+
+    # Для экономии: если есть фактическая сумма - используем её, иначе сумму договора
+    actual_sum = np.where(fakt_sum > 0, fakt_sum, contract_sum)
 
     # Таблица 1: по способам закупки
-    methods_data = defaultdict(lambda: {\"plan_sum\": 0, \"contract_sum\": 0, \"actual_sum\": 0, \"count\": 0})
+    m_count = np.bincount(method_codes, minlength=n_methods)
+    m_plan = np.bincount(method_codes, weights=plan_sum, minlength=n_methods)
+    m_contract = np.bincount(method_codes, weights=contract_sum, minlength=n_methods)
+    m_actual = np.bincount(method_codes, weights=actual_sum, minlength=n_methods)
+    methods_data = {
+        methods[i]: {
+            "plan_sum": float(m_plan[i]),
+            "contract_sum": float(m_contract[i]),
+            "actual_sum": float(m_actual[i]),
+            "count": int(m_count[i])
+        }
+        for i in range(n_methods)
+    }
 
     # Таблица 2: по способам и видам
-    methods_types_data = defaultdict(lambda: defaultdict(lambda: {\"count\": 0, \"sum\": 0}))
+    pair_codes, pairs = pd.factorize(method_codes.astype(np.int64) * max(n_types, 1) + type_codes)
+    p_count = np.bincount(pair_codes, minlength=len(pairs))
+    p_sum = np.bincount(pair_codes, weights=contract_sum, minlength=len(pairs))
+    methods_types_data = {method: {} for method in methods}
+    for i, pair in enumerate(pairs):
+        method, subject_type = methods[pair // max(n_types, 1)], subject_types[pair % max(n_types, 1)]
+        methods_types_data[method][subject_type] = {"count": int(p_count[i]), "sum": float(p_sum[i])}
 
     # Итоги по видам
-    types_data = defaultdict(lambda: 0)
-
-    for c in contracts:
-        method = c.get(\"FaktTradeMethods\", {}).get(\"nameRu\") if c.get(\"FaktTradeMethods\") else \"Не указан\"
-        subject_type = c.get(\"RefSubjectType\", {}).get(\"nameRu\") if c.get(\"RefSubjectType\") else \"Не указан\"
-
-        contract_sum = float(c.get(\"contractSum\", 0) or 0)
-        fakt_sum = float(c.get(\"faktSum\", 0) or 0)
-        plan_sum = float(get_plan_amount(c) or 0)
-
-        # Для экономии: если есть фактическая сумма - используем её, иначе сумму договора
-        actual_sum = fakt_sum if fakt_sum > 0 else contract_sum
-
-        # Таблица 1
-        methods_data[method][\"plan_sum\"] += plan_sum
-        methods_data[method][\"contract_sum\"] += contract_sum
-        methods_data[method][\"actual_sum\"] += actual_sum
-        methods_data[method][\"count\"] += 1
-
-        # Таблица 2
-        methods_types_data[method][subject_type][\"count\"] += 1
-        methods_types_data[method][subject_type][\"sum\"] += contract_sum
+    t_sum = np.bincount(type_codes, weights=contract_sum, minlength=n_types)
+    types_data = {subject_types[i]: float(t_sum[i]) for i in range(n_types)}
+
+    # Общие итоги
+    totals = {
+        "plan_sum": float(plan_sum.sum()),
+        "contract_sum": float(contract_sum.sum()),
+        "actual_sum": float(actual_sum.sum()),
+        "count": len(df)
+    }
+    totals["economy"] = totals["plan_sum"] - totals["actual_sum"]
 
-        # Итоги по видам
-        types_data[subject_type] += contract_sum
+    return methods_data, methods_types_data, types_data, totals
 
-    return methods_data, methods_types_data, types_data
+@metrics.timed("aggregate_data")
+def aggregate_data(contracts):
+    """Агрегация данных по способам закупки и видам предмета"""
+    return aggregate_frame(flatten_contracts(contracts))
 
 def format_number(value):
-    \"\"\"Форматирование числа в тыс. тенге (округление без знаков после запятой)\"\"\"
+    """Форматирование числа в тыс. тенге (округление без знаков после запятой)"""
     return round(value / 1000)
 
-def create_report(contracts, filename, terminated_count=0, announcements_data=None, ann_dates=None):
-    \"\"\"Создание Excel-отчёта\"\"\"
-    
-    methods_data, methods_types_data, types_data = aggregate_data(contracts)
-
-    total_contract_sum = sum(m[\"contract_sum\"] for m in methods_data.values())
-    total_actual_sum = sum(m[\"actual_sum\"] for m in methods_data.values())
-    total_plan_sum = sum(m[\"plan_sum\"] for m in methods_data.values())
-    total_economy = total_plan_sum - total_actual_sum
-    total_count = sum(m[\"count\"] for m in methods_data.values())
+@metrics.timed("create_report")
+def create_report(contracts, filename, terminated_count=0, announcements_data=None, ann_dates=None, fin_year=None, quarter=None):
+    """Создание Excel-отчёта (contracts может быть генератором)"""
+    write_report(aggregate_data(contracts), filename, terminated_count, announcements_data, ann_dates, fin_year, quarter)
+
+@metrics.timed("write_report")
+def write_report(aggregates, filename, terminated_count=0, announcements_data=None, ann_dates=None, fin_year=None, quarter=None):
+    """Запись Excel-отчёта по результату aggregate_data (quarter None - годовой)"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
+    fin_year = fin_year or config.FIN_YEAR
+    methods_data, methods_types_data, types_data, totals = aggregates
+
+    total_contract_sum = totals["contract_sum"]
+    total_actual_sum = totals["actual_sum"]
+    total_plan_sum = totals["plan_sum"]
+    total_economy = totals["economy"]
+    total_count = totals["count"]
     
     wb = Workbook()
     ws = wb.active
-    ws.title = \"Итоги закупок\"
+    ws.title = "Итоги закупок"
     
     # Стили
     font_title = Font(name='Times New Roman', size=16, bold=True)
@@ -318,10 +233,10 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row = 1
 
     # Заголовок отчёта
-    if QUARTER:
-        report_title = f\"ИТОГИ ГОСУДАРСТВЕННЫХ ЗАКУПОК ЗА {QUARTER} КВАРТАЛ {FIN_YEAR} ГОДА\"
+    if quarter:
+        report_title = f"ИТОГИ ГОСУДАРСТВЕННЫХ ЗАКУПОК ЗА {quarter} КВАРТАЛ {fin_year} ГОДА"
     else:
-        report_title = f\"ИТОГИ ГОСУДАРСТВЕННЫХ ЗАКУПОК ЗА {FIN_YEAR} ГОД\"
+        report_title = f"ИТОГИ ГОСУДАРСТВЕННЫХ ЗАКУПОК ЗА {fin_year} ГОД"
     ws.cell(row=row, column=2, value=report_title)
     ws.cell(row=row, column=2).font = font_title
     ws.cell(row=row, column=2).alignment = alignment_center
@@ -330,14 +245,14 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row += 2
 
     # Подзаголовок со статусами
-    ws.cell(row=row, column=2, value=\"Статусы договоров: Исполнен, Частично исполнен, Действует\")
+    ws.cell(row=row, column=2, value="Статусы договоров: Исполнен, Частично исполнен, Действует")
     ws.cell(row=row, column=2).font = font_normal
     ws.cell(row=row, column=2).alignment = alignment_center
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
     row += 2
 
     # Сводка
-    ws.cell(row=row, column=2, value=f\"Фактическая сумма по итогам государственных закупок составляет {format_number(total_actual_sum):,} тыс. тенге (без НДС). Экономия составила {format_number(total_economy):,} тыс. тенге.\".replace(\",\", \" \"))
+    ws.cell(row=row, column=2, value=f"Фактическая сумма по итогам государственных закупок составляет {format_number(total_actual_sum):,} тыс. тенге (без НДС). Экономия составила {format_number(total_economy):,} тыс. тенге.".replace(",", " "))
     ws.cell(row=row, column=2).font = font_bold
     ws.cell(row=row, column=2).alignment = alignment_left
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
@@ -345,20 +260,20 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row += 2
 
     # Вид предмета закупок
-    ws.cell(row=row, column=2, value=\"Вид предмета закупок (по закупкам не превышающие финансовый год):\")
+    ws.cell(row=row, column=2, value="Вид предмета закупок (по закупкам не превышающие финансовый год):")
     ws.cell(row=row, column=2).font = font_bold
     row += 1
 
     for subject_type, sum_val in types_data.items():
-        ws.cell(row=row, column=2, value=f\"{subject_type} - {format_number(sum_val):,} тыс. тенге\".replace(\",\", \" \"))
+        ws.cell(row=row, column=2, value=f"{subject_type} - {format_number(sum_val):,} тыс. тенге".replace(",", " "))
         ws.cell(row=row, column=2).font = font_normal
         row += 1
 
-    ws.cell(row=row, column=2, value=f\"ИТОГО - {format_number(total_contract_sum):,} тыс. тенге\".replace(\",\", \" \"))
+    ws.cell(row=row, column=2, value=f"ИТОГО - {format_number(total_contract_sum):,} тыс. тенге".replace(",", " "))
     ws.cell(row=row, column=2).font = font_bold
     row += 2
 
-    ws.cell(row=row, column=2, value=f\"Согласно видам по закупкам (по закупкам не превышающие финансовый год): заключено {total_count} договоров на общую сумму {format_number(total_contract_sum):,} тыс. тенге (статус договоров: исполнен/частично исполнен + действует).\".replace(\",\", \" \"))
+    ws.cell(row=row, column=2, value=f"Согласно видам по закупкам (по закупкам не превышающие финансовый год): заключено {total_count} договоров на общую сумму {format_number(total_contract_sum):,} тыс. тенге (статус договоров: исполнен/частично исполнен + действует).".replace(",", " "))
     ws.cell(row=row, column=2).font = font_normal
     ws.cell(row=row, column=2).alignment = alignment_left
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
@@ -366,12 +281,12 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row += 3
 
     # Таблица 1: по способам закупки
-    ws.cell(row=row, column=2, value=\"Закупки по видам не превышающие финансовый год (тыс. тенге)\")
+    ws.cell(row=row, column=2, value="Закупки по видам не превышающие финансовый год (тыс. тенге)")
     ws.cell(row=row, column=2).font = font_bold
     row += 2
 
     # Заголовки таблицы 1
-    headers1 = [\"№\", \"Способ закупок\", \"Планируемая сумма без НДС\", \"Планируемая сумма с НДС\", \"Фактическая сумма без НДС\", \"Фактическая сумма с НДС\", \"Экономия без НДС\", \"Экономия с НДС\"]
+    headers1 = ["№", "Способ закупок", "Планируемая сумма без НДС", "Планируемая сумма с НДС", "Фактическая сумма без НДС", "Фактическая сумма с НДС", "Экономия без НДС", "Экономия с НДС"]
     for col, header in enumerate(headers1, 2):
         cell = ws.cell(row=row, column=col, value=header)
         cell.font = font_header
@@ -384,11 +299,11 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     # Данные таблицы 1
     NDS_RATE = 1.12
     for idx, (method, data) in enumerate(methods_data.items(), 1):
-        economy = data[\"plan_sum\"] - data[\"actual_sum\"]
-        plan_sum_val = format_number(data[\"plan_sum\"]) if data[\"plan_sum\"] > 0 else \"-\"
-        plan_sum_nds = format_number(data[\"plan_sum\"] * NDS_RATE) if data[\"plan_sum\"] > 0 else \"-\"
-        actual_sum_val = format_number(data[\"actual_sum\"])
-        actual_sum_nds = format_number(data[\"actual_sum\"] * NDS_RATE)
+        economy = data["plan_sum"] - data["actual_sum"]
+        plan_sum_val = format_number(data["plan_sum"]) if data["plan_sum"] > 0 else "-"
+        plan_sum_nds = format_number(data["plan_sum"] * NDS_RATE) if data["plan_sum"] > 0 else "-"
+        actual_sum_val = format_number(data["actual_sum"])
+        actual_sum_nds = format_number(data["actual_sum"] * NDS_RATE)
         economy_val = format_number(economy) if economy != 0 else 0
         economy_nds = format_number(economy * NDS_RATE) if economy != 0 else 0
         values = [idx, method, plan_sum_val, plan_sum_nds, actual_sum_val, actual_sum_nds, economy_val, economy_nds]
@@ -407,7 +322,7 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
         row += 1
 
     # Итого таблицы 1
-    totals = [\"\", \"ИТОГО:\", format_number(total_plan_sum), format_number(total_plan_sum * NDS_RATE), format_number(total_actual_sum), format_number(total_actual_sum * NDS_RATE), format_number(total_economy), format_number(total_economy * NDS_RATE)]
+    totals = ["", "ИТОГО:", format_number(total_plan_sum), format_number(total_plan_sum * NDS_RATE), format_number(total_actual_sum), format_number(total_actual_sum * NDS_RATE), format_number(total_economy), format_number(total_economy * NDS_RATE)]
     for col, val in enumerate(totals, 2):
         cell = ws.cell(row=row, column=col, value=val)
         cell.font = font_bold
@@ -422,21 +337,21 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row += 1
 
     # Примечание о расчёте НДС
-    ws.cell(row=row, column=2, value=\"* Суммы с НДС рассчитаны с применением ставки 12% для всех договоров, независимо от статуса плательщика НДС поставщика.\")
+    ws.cell(row=row, column=2, value="* Суммы с НДС рассчитаны с применением ставки 12% для всех договоров, независимо от статуса плательщика НДС поставщика.")
     ws.cell(row=row, column=2).font = Font(name='Times New Roman', size=10, italic=True)
     ws.cell(row=row, column=2).alignment = alignment_left
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=9)
     row += 1
 
     # Примечание о фактических суммах
-    ws.cell(row=row, column=2, value=\"** Фактическая сумма без НДС: для плательщиков НДС указана сумма без НДС, для неплательщиков НДС — без изменений.\")
+    ws.cell(row=row, column=2, value="** Фактическая сумма без НДС: для плательщиков НДС указана сумма без НДС, для неплательщиков НДС — без изменений.")
     ws.cell(row=row, column=2).font = Font(name='Times New Roman', size=10, italic=True)
     ws.cell(row=row, column=2).alignment = alignment_left
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=9)
     row += 3
 
     # Таблица 2: по способам и видам
-    headers2 = [\"№\", \"Способ закупки/вид закупки\", \"Количество договоров\", \"Общая сумма договоров без НДС\"]
+    headers2 = ["№", "Способ закупки/вид закупки", "Количество договоров", "Общая сумма договоров без НДС"]
     for col, header in enumerate(headers2, 2):
         cell = ws.cell(row=row, column=col, value=header)
         cell.font = font_header
@@ -458,24 +373,24 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
         cell.alignment = alignment_left
         cell.border = thin_border
         for col in [4, 5]:
-            cell = ws.cell(row=row, column=col, value=\"\")
+            cell = ws.cell(row=row, column=col, value="")
             cell.border = thin_border
         row += 1
         row_num += 1
 
         # Строки видов предмета
         for subject_type, data in types.items():
-            cell = ws.cell(row=row, column=2, value=\"\")
+            cell = ws.cell(row=row, column=2, value="")
             cell.border = thin_border
             cell = ws.cell(row=row, column=3, value=subject_type)
             cell.font = font_normal
             cell.alignment = alignment_left
             cell.border = thin_border
-            cell = ws.cell(row=row, column=4, value=data[\"count\"])
+            cell = ws.cell(row=row, column=4, value=data["count"])
             cell.font = font_normal
             cell.alignment = alignment_right
             cell.border = thin_border
-            cell = ws.cell(row=row, column=5, value=format_number(data[\"sum\"]))
+            cell = ws.cell(row=row, column=5, value=format_number(data["sum"]))
             cell.font = font_normal
             cell.alignment = alignment_right
             cell.border = thin_border
@@ -483,10 +398,10 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
             row += 1
 
     # Итого таблицы 2
-    cell = ws.cell(row=row, column=2, value=\"\")
+    cell = ws.cell(row=row, column=2, value="")
     cell.border = thin_border
     cell.fill = total_fill
-    cell = ws.cell(row=row, column=3, value=\"ИТОГО\")
+    cell = ws.cell(row=row, column=3, value="ИТОГО")
     cell.font = font_bold
     cell.alignment = alignment_left
     cell.border = thin_border
@@ -505,13 +420,13 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     row += 3
 
     # Информация о расторгнутых договорах
-    ws.cell(row=row, column=2, value=f\"Количество расторгнутых договоров: {terminated_count}\")
+    ws.cell(row=row, column=2, value=f"Количество расторгнутых договоров: {terminated_count}")
     ws.cell(row=row, column=2).font = font_bold
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=5)
     row += 2
 
     # Примечание о расчёте экономии
-    ws.cell(row=row, column=2, value=\"Примечание: Экономия = Плановая сумма - Фактическая сумма (если факт > 0, иначе сумма договора)\")
+    ws.cell(row=row, column=2, value="Примечание: Экономия = Плановая сумма - Фактическая сумма (если факт > 0, иначе сумма договора)")
     ws.cell(row=row, column=2).font = Font(name='Times New Roman', size=10, italic=True)
     ws.cell(row=row, column=2).alignment = alignment_left
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
@@ -520,14 +435,14 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
 
     # Сводка по объявлениям
     if announcements_data:
-        ann_period = f\"{ann_dates[0]} - {ann_dates[1]}\" if ann_dates else \"н/д\"
-        ws.cell(row=row, column=2, value=f\"ОБЪЯВЛЕНИЯ О ЗАКУПКАХ за период {ann_period}\")
+        ann_period = f"{ann_dates[0]} - {ann_dates[1]}" if ann_dates else "н/д"
+        ws.cell(row=row, column=2, value=f"ОБЪЯВЛЕНИЯ О ЗАКУПКАХ за период {ann_period}")
         ws.cell(row=row, column=2).font = font_bold
         ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=4)
         row += 2
 
         # Заголовки
-        ann_headers = [\"№\", \"Способ закупки\", \"Количество\"]
+        ann_headers = ["№", "Способ закупки", "Количество"]
         for col, header in enumerate(ann_headers, 2):
             cell = ws.cell(row=row, column=col, value=header)
             cell.font = font_header
@@ -555,7 +470,7 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
             row += 1
 
         # Итого
-        totals_ann = [\"\", \"ИТОГО\", total_ann]
+        totals_ann = ["", "ИТОГО", total_ann]
         for col, val in enumerate(totals_ann, 2):
             cell = ws.cell(row=row, column=col, value=val)
             cell.font = font_bold
@@ -586,34 +501,239 @@ def create_report(contracts, filename, terminated_count=0, announcements_data=No
     ws.page_margins.right = 0.5
 
     wb.save(filename)
-    print(f\"Отчёт сохранён: {filename}\")
+    print(f"Отчёт сохранён: {filename}")
+
+def report_filename(fin_year, quarter, bin_company=None):
+    """Путь к файлу отчёта в REPORTS_DIR"""
+    prefix = f"report_{bin_company}_{fin_year}" if bin_company else f"report_{fin_year}"
+    suffix = f"_Q{quarter}" if quarter else ""
+    return report_path(f"{prefix}{suffix}.xlsx")
+
+def fetch_stage(name, func, *args):
+    """Вызов func(*args) с замером этапа name (для потоков выгрузки)"""
+    with metrics.stage(name):
+        return func(*args)
+
+def fetch_report_batched(bin_company, fin_year, quarter, ann_date_from, ann_date_to):
+    """Три выгрузки отчёта одним запросом на страницу (псевдонимы GraphQL)
+
+    Страницы каждого псевдонима передаются своему потребителю: договоры - в
+    aggregate_data по мере загрузки, расторгнутые и объявления - в счётчики.
+    """
+    streams = {
+        "contracts": ("Contract", contracts_filter(bin_company, fin_year, quarter, CONTRACT_STATUSES), REPORT_CONTRACT_FIELDS),
+        "terminated": ("Contract", contracts_filter(bin_company, fin_year, quarter, TERMINATED_STATUSES), TERMINATED_FIELDS),
+        "announcements": ("TrdBuy", announcements_filter(ann_date_from, ann_date_to, bin_company), ANNOUNCEMENT_SUMMARY_FIELDS),
+    }
+    results = {"terminated": 0, "announcements": defaultdict(int)}
+
+    def contract_pages():
+        for alias, records in paginate_batch(streams):
+            if alias == "contracts":
+                yield list(map(parse_contract, records))
+            elif alias == "terminated":
+                results["terminated"] += len(records)
+            else:
+                for a in map(parse_announcement, records):
+                    results["announcements"][a.trade_method or "Не указан"] += 1
+
+    def contracts():
+        loaded = 0
+        for records in with_plan_amounts(contract_pages()):
+            yield from records
+            loaded += len(records)
+            print(f"Загружено: {loaded} договоров...")
 
-if __name__ == \"__main__\":
-    print(f\"Генерация отчёта за {FIN_YEAR} год для заказчика {BIN_COMPANY}...\")
-    print(f\"Фильтр: статусы {CONTRACT_STATUSES}, типы договоров {CONTRACT_TYPES}\")
+    with metrics.stage("fetch_report"):
+        results["contracts"] = aggregate_data(contracts())
+    results["announcements"] = dict(results["announcements"])
+    return results
 
-    contracts = get_contracts_for_report()
-    terminated_count = get_terminated_contracts_count(QUARTER)
-    print(f\"Расторгнутых договоров: {terminated_count}\")
+def build_report(bin_company=None, fin_year=None, quarter=None, filename=None, max_workers=None, batch=None):
+    """Выгрузка данных и формирование отчёта по одному заказчику (quarter None - годовой); возвращает сводку"""
 
-    # Определяем период для объявлений
-    if QUARTER:
-        ann_date_from, ann_date_to = get_quarter_dates(FIN_YEAR, QUARTER)
+    bin_company = bin_company or config.BIN_COMPANY
+    fin_year = fin_year or config.FIN_YEAR
+    batch = config.ALIAS_BATCHING if batch is None else batch
+
+    # Период для объявлений: квартал или весь год
+    ann_date_from, ann_date_to = get_quarter_dates(fin_year, quarter)
+
+    if batch:
+        results = fetch_report_batched(bin_company, fin_year, quarter, ann_date_from, ann_date_to)
     else:
-        ann_date_from, ann_date_to = get_quarter_dates(FIN_YEAR, None)  # Весь год
-    print(f\"Загрузка объявлений за период {ann_date_from} - {ann_date_to}...\")
-    announcements_data = get_announcements_by_method(ann_date_from, ann_date_to)
-    print(f\"Объявлений: {sum(announcements_data.values())}\")
-
-    if contracts:
-        # Фильтрация по кварталу
-        if QUARTER:
-            contracts = filter_by_quarter(contracts, QUARTER)
-            print(f\"После фильтрации по {QUARTER} кварталу: {len(contracts)} договоров\")
-            filename = os.path.join(REPORTS_DIR, f\"report_{FIN_YEAR}_Q{QUARTER}.xlsx\")
+        # Три независимые выгрузки выполняются одновременно;
+        # договоры агрегируются по мере загрузки, без накопления в памяти
+        results = run_parallel({
+            "contracts": lambda: fetch_stage("fetch_contracts", aggregate_data, iter_contracts_for_report(bin_company, fin_year, quarter)),
+            "terminated": lambda: fetch_stage("fetch_terminated", get_terminated_contracts_count, quarter, bin_company, fin_year),
+            "announcements": lambda: fetch_stage("fetch_announcements", get_announcements_by_method, ann_date_from, ann_date_to, bin_company),
+        }, max_workers)
+    return finish_report(results["contracts"], results["terminated"], results["announcements"],
+                         bin_company, fin_year, quarter, filename)
+
+def finish_report(aggregates, terminated, announcements, bin_company, fin_year, quarter, filename=None):
+    """Запись отчёта за период (если есть договоры) и сводка по нему"""
+    totals = aggregates[3]
+
+    summary = {
+        "bin": bin_company,
+        "fin_year": fin_year,
+        "quarter": quarter,
+        "count": totals["count"],
+        "plan_sum": totals["plan_sum"],
+        "contract_sum": totals["contract_sum"],
+        "actual_sum": totals["actual_sum"],
+        "terminated": terminated,
+        "announcements": sum(announcements.values()),
+        "filename": None
+    }
+
+    if summary["count"]:
+        filename = filename or report_filename(fin_year, quarter)
+        write_report(aggregates, filename, terminated, announcements, get_quarter_dates(fin_year, quarter), fin_year, quarter)
+        summary["filename"] = filename
+    return summary
+
+def period_quarter(date, fin_year):
+    """Квартал финансового года по дате "ГГГГ-ММ-ДД" (0 - дата вне года или не указана)"""
+    if not date or date[:4] != str(fin_year):
+        return 0
+    return (int(date[5:7]) - 1) // 3 + 1
+
+def fetch_year(bin_company, fin_year, max_workers=None, batch=None):
+    """Одна выгрузка за весь год для отчётов по всем периодам
+
+    Возвращает записи договоров, число расторгнутых по кварталам подписания
+    (индекс 0 - вне кварталов года) и объявления по способам: за год (ключ None)
+    и по кварталам публикации.
+    """
+    streams = {
+        "contracts": ("Contract", contracts_filter(bin_company, fin_year, None, CONTRACT_STATUSES), REPORT_CONTRACT_FIELDS),
+        "terminated": ("Contract", contracts_filter(bin_company, fin_year, None, TERMINATED_STATUSES), TERMINATED_FIELDS + ("signDate",)),
+        "announcements": ("TrdBuy", announcements_filter(*get_quarter_dates(fin_year, None), bin_company), ANNOUNCEMENT_SUMMARY_FIELDS + ("publishDate",)),
+    }
+    contracts = []
+    terminated = [0] * 5
+    announcements = {q: defaultdict(int) for q in (None, 0, 1, 2, 3, 4)}
+    batch = config.ALIAS_BATCHING if batch is None else batch
+
+    plans = PlanLoader()
+
+    # Потребители страниц: каждый изменяет только свою структуру
+    def consume(alias, records):
+        if alias == "contracts":
+            records = list(map(parse_contract, records))
+            plans.submit(records)
+            contracts.extend(records)
+            print(f"Загружено: {len(contracts)} договоров...")
+        elif alias == "terminated":
+            for c in records:
+                terminated[period_quarter((c.get("signDate") or "")[:10], fin_year)] += 1
         else:
-            filename = os.path.join(REPORTS_DIR, f\"report_{FIN_YEAR}.xlsx\")
-        create_report(contracts, filename, terminated_count, announcements_data, (ann_date_from, ann_date_to))
-        print(f\"\\nГотово! Найдено договоров: {len(contracts)}\")
+            for a in map(parse_announcement, records):
+                method = a.trade_method or "Не указан"
+                announcements[None][method] += 1
+                announcements[period_quarter(a.publish_date, fin_year)][method] += 1
+
+    with metrics.stage("fetch_year"):
+        try:
+            if batch:
+                for alias, records in paginate_batch(streams):
+                    consume(alias, records)
+            else:
+                def fetch(alias):
+                    for records in paginate(*streams[alias]):
+                        consume(alias, records)
+                run_parallel({alias: lambda alias=alias: fetch(alias) for alias in streams}, max_workers)
+            # Дожидаемся плановых сумм всех страниц договоров
+            for _ in plans.done():
+                pass
+        finally:
+            plans.close()
+    return contracts, terminated, announcements
+
+def build_year_reports(bin_company=None, fin_year=None, filenames=None, max_workers=None, batch=None):
+    """Годовой и четыре квартальных отчёта из одной выгрузки за год; возвращает список сводок
+
+    filenames - {квартал (None - год): путь}; по умолчанию report_filename.
+    """
+    import numpy as np
+
+    bin_company = bin_company or config.BIN_COMPANY
+    fin_year = fin_year or config.FIN_YEAR
+    contracts, terminated, announcements = fetch_year(bin_company, fin_year, max_workers, batch)
+
+    # Договоры раскладываются по кварталам подписания за один проход
+    with metrics.stage("aggregate_data"):
+        df = flatten_contracts(contracts)
+        quarters = np.fromiter((period_quarter(c.sign_date, fin_year) for c in contracts), dtype=np.int8, count=len(contracts))
+        aggregates = {None: aggregate_frame(df)}
+        for quarter in range(1, 5):
+            aggregates[quarter] = aggregate_frame(df[quarters == quarter])
+    del contracts, df
+
+    summaries = []
+    for quarter in (None, 1, 2, 3, 4):
+        summaries.append(finish_report(aggregates[quarter], terminated[quarter] if quarter else sum(terminated),
+                                       dict(announcements[quarter]), bin_company, fin_year, quarter, (filenames or {}).get(quarter)))
+    return summaries
+
+def build_report_from_store(conn, bin_company=None, fin_year=None, quarter=None, filename=None):
+    """Отчёт по локальному хранилищу (агрегаты и счётчики - запросами SQL); возвращает сводку"""
+    import store
+
+    bin_company = bin_company or config.BIN_COMPANY
+    fin_year = fin_year or config.FIN_YEAR
+    date_from, date_to = get_quarter_dates(fin_year, quarter) if quarter else (None, None)
+
+    with metrics.stage("aggregate_data"):
+        aggregates = store.aggregate_contracts(conn, bin_company, fin_year, CONTRACT_STATUSES, date_from, date_to)
+        terminated = store.count_contracts_by_status(conn, bin_company, fin_year, TERMINATED_STATUSES, date_from, date_to)
+        announcements = store.count_announcements_by_method(conn, bin_company, *get_quarter_dates(fin_year, quarter))
+    return finish_report(aggregates, terminated, announcements, bin_company, fin_year, quarter, filename)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация аналитического отчёта по закупкам")
+    parser.add_argument("--all-periods", action="store_true", help="годовой и все квартальные отчёты из одной выгрузки за год")
+    parser.add_argument("--from-store", action="store_true", help="отчёт по локальному хранилищу (см. sync_contracts.py), без обращения к API")
+    parser.add_argument("--sync", action="store_true", help="догрузить изменения в локальное хранилище и построить отчёт по нему")
+    cache.add_arguments(parser)
+    checkpoint.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure(args)
+    checkpoint.configure(args)
+    metrics.configure(args)
+
+    print(f"Генерация отчёта за {config.FIN_YEAR} год для заказчика {config.BIN_COMPANY}...")
+    print(f"Фильтр: статусы {CONTRACT_STATUSES}, типы договоров {CONTRACT_TYPES}")
+
+    if args.from_store or args.sync:
+        import store
+        conn = store.connect()
+        if args.sync:
+            from sync_contracts import sync_announcements, sync_contracts
+            fetched = sync_contracts(conn, config.BIN_COMPANY, config.FIN_YEAR)
+            print(f"Синхронизировано: {fetched} договоров, {sync_announcements(conn, config.BIN_COMPANY, config.FIN_YEAR)} объявлений")
+        for quarter in [None, 1, 2, 3, 4] if args.all_periods else [config.QUARTER]:
+            summary = build_report_from_store(conn, quarter=quarter)
+            period = f"{quarter} квартал" if quarter else "год"
+            print(f"{period}: договоров {summary['count']}, расторгнуто {summary['terminated']}, объявлений {summary['announcements']}")
+        conn.close()
+    elif args.all_periods:
+        for summary in build_year_reports():
+            period = f"{summary['quarter']} квартал" if summary["quarter"] else "год"
+            print(f"{period}: договоров {summary['count']}, расторгнуто {summary['terminated']}, объявлений {summary['announcements']}")
     else:
-        print(\"Договоры не найдены.\")
+        summary = build_report(quarter=config.QUARTER)
+        print(f"Расторгнутых договоров: {summary['terminated']}")
+        print(f"Объявлений: {summary['announcements']}")
+
+        if summary["count"]:
+            if config.QUARTER:
+                print(f"После фильтрации по {config.QUARTER} кварталу: {summary['count']} договоров")
+            print(f"\nГотово! Найдено договоров: {summary['count']}")
+        else:
+            print("Договоры не найдены.")
+    metrics.finish()
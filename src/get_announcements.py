@@ -1,75 +1,48 @@
-import requests
-import os
+import argparse
 from collections import defaultdict
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from config import TOKEN, BASE_URL, PAGE_LIMIT, BIN_COMPANY, DATE_FROM, DATE_TO, REPORTS_DIR
-
-def get_announcements(date_from, date_to):
-    """Получение объявлений о закупках через GraphQL за период"""
-
-    headers = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Content-Type": "application/json"
+import config
+from config import report_path
+import cache
+import checkpoint
+import metrics
+from api_client import iter_records
+from models import parse_announcement
+
+# Поля объявления для сводки по способам закупки
+ANNOUNCEMENT_FIELDS = ("id", "refTradeMethodsId")
+
+def iter_announcements(date_from, date_to, bin_company=None, fields=ANNOUNCEMENT_FIELDS, use_cache=True):
+    """Потоковое получение объявлений о закупках за период (генератор записей Announcement)"""
+
+    filter = {
+        "orgBin": bin_company or config.BIN_COMPANY,
+        "publishDate": [date_from, date_to]
     }
 
-    all_announcements = []
-    after = 0
-
-    while True:
-        query = {
-            "query": """
-                query($limit: Int, $after: Int, $filter: TrdBuyFiltersInput!) {
-                    TrdBuy(limit: $limit, after: $after, filter: $filter) {
-                        id
-                        RefTradeMethods {
-                            nameRu
-                        }
-                    }
-                }
-            """,
-            "variables": {
-                "limit": PAGE_LIMIT,
-                "after": after,
-                "filter": {
-                    "orgBin": BIN_COMPANY,
-                    "publishDate": [date_from, date_to]
-                }
-            }
-        }
-
-        response = requests.post(f"{BASE_URL}/v3/graphql", json=query, headers=headers)
-        data = response.json()
-
-        if "errors" in data:
-            print(f"Ошибка API: {data['errors']}")
-            break
+    return map(parse_announcement, iter_records("TrdBuy", filter, fields, use_cache=use_cache))
 
-        announcements = data.get("data", {}).get("TrdBuy", [])
-        if not announcements:
-            break
-
-        all_announcements.extend(announcements)
-
-        page_info = data.get("extensions", {}).get("pageInfo", {})
-        if not page_info.get("hasNextPage", False):
-            break
-        after = page_info.get("lastId", 0)
-
-    return all_announcements
+def get_announcements(date_from, date_to):
+    """Получение объявлений о закупках через GraphQL за период"""
+    return list(iter_announcements(date_from, date_to))
 
 def count_by_method(announcements):
     """Подсчёт объявлений по способам закупки"""
     methods_count = defaultdict(int)
 
     for a in announcements:
-        method = a.get("RefTradeMethods", {}).get("nameRu") if a.get("RefTradeMethods") else "Не указан"
-        methods_count[method] += 1
+        methods_count[a.trade_method or "Не указан"] += 1
 
     return methods_count
 
-def save_to_excel(methods_count, total_count, filename):
+@metrics.timed("save_to_excel")
+def save_to_excel(methods_count, total_count, filename, bin_company=None, date_from=None, date_to=None):
     """Сохранение отчета по объявлениям в Excel с форматированием"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
+    bin_company = bin_company or config.BIN_COMPANY
+    date_from = date_from or config.DATE_FROM
+    date_to = date_to or config.DATE_TO
     
     wb = Workbook()
     ws = wb.active
@@ -103,13 +76,13 @@ def save_to_excel(methods_count, total_count, filename):
     row += 1
     
     # Период и заказчик
-    ws.cell(row=row, column=2, value=f"Период: {DATE_FROM} - {DATE_TO}")
+    ws.cell(row=row, column=2, value=f"Период: {date_from} - {date_to}")
     ws.cell(row=row, column=2).font = font_normal
     ws.cell(row=row, column=2).alignment = alignment_center
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=4)
     row += 1
     
-    ws.cell(row=row, column=2, value=f"БИН заказчика: {BIN_COMPANY}")
+    ws.cell(row=row, column=2, value=f"БИН заказчика: {bin_company}")
     ws.cell(row=row, column=2).font = font_normal
     ws.cell(row=row, column=2).alignment = alignment_center
     ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=4)
@@ -163,26 +136,37 @@ def save_to_excel(methods_count, total_count, filename):
     print(f"Отчёт сохранён: {filename}")
 
 if __name__ == "__main__":
-    print(f"Период: {DATE_FROM} - {DATE_TO}")
-    print(f"Заказчик: {BIN_COMPANY}\n")
+    parser = argparse.ArgumentParser(description="Сводка по объявлениям о закупках")
+    cache.add_arguments(parser)
+    checkpoint.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure(args)
+    checkpoint.configure(args)
+    metrics.configure(args)
+
+    print(f"Период: {config.DATE_FROM} - {config.DATE_TO}")
+    print(f"Заказчик: {config.BIN_COMPANY}\n")
 
-    announcements = get_announcements(DATE_FROM, DATE_TO)
+    with metrics.stage("fetch_announcements"):
+        methods_count = count_by_method(iter_announcements(config.DATE_FROM, config.DATE_TO))
+    total_count = sum(methods_count.values())
 
-    if announcements:
-        methods_count = count_by_method(announcements)
+    if total_count:
 
         print("Способ закупки                                    | Кол-во")
         print("-" * 60)
         for method, count in sorted(methods_count.items(), key=lambda x: -x[1]):
             print(f"{method[:48]:<48} | {count}")
         print("-" * 60)
-        print(f"{'ИТОГО':<48} | {len(announcements)}")
+        print(f"{'ИТОГО':<48} | {total_count}")
         
         # Сохранение в Excel
-        period_start = DATE_FROM.replace('-', '')
-        period_end = DATE_TO.replace('-', '')
-        filename = os.path.join(REPORTS_DIR, f"announcements_{BIN_COMPANY}_{period_start}_{period_end}.xlsx")
-        save_to_excel(methods_count, len(announcements), filename)
-        print(f"\nВсего объявлений: {len(announcements)}")
+        period_start = config.DATE_FROM.replace('-', '')
+        period_end = config.DATE_TO.replace('-', '')
+        filename = report_path(f"announcements_{config.BIN_COMPANY}_{period_start}_{period_end}.xlsx")
+        save_to_excel(methods_count, total_count, filename)
+        print(f"\nВсего объявлений: {total_count}")
     else:
         print("Объявления не найдены.")
+    metrics.finish()
@@ -1,93 +1,50 @@
-import requests
-import pandas as pd
-import os
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
-from config import TOKEN, BASE_URL, PAGE_LIMIT, BIN_COMPANY, FIN_YEAR, REPORTS_DIR
+import argparse
+import config
+from config import report_path
+import cache
+import checkpoint
+import metrics
+import store
+from api_client import paginate
+from models import parse_contract
+from plans import with_plan_amounts
 
-def get_contracts(bin_company, fin_year):
-    """Получение договоров через GraphQL (заказчик, по финансовому году)"""
+# Поля договора для реестра (и для локального хранилища: статус нужен для синхронизации);
+# плановые суммы загружаются второй фазой, см. plans.py
+CONTRACT_FIELDS = (
+    "id",
+    "contractNumber",
+    "signDate",
+    "contractSum",
+    "faktSum",
+    "descriptionRu",
+    "finYear",
+    "refContractStatusId",
+    "refSubjectTypeId",
+    "refContractTypeId",
+    "faktTradeMethodsId",
+    "Supplier.nameRu",
+    "TrdBuy.numberAnno",
+)
+
+def iter_contracts(bin_company, fin_year):
+    """Потоковое получение договоров через GraphQL (генератор записей Contract)"""
     
-    headers = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Content-Type": "application/json"
+    filter = {
+        "customerBin": bin_company,
+        "finYear": fin_year
     }
     
-    all_contracts = []
-    after = 0
-    
-    while True:
-        query = {
-            "query": """
-                query($limit: Int, $after: Int, $filter: ContractFiltersInput!) {
-                    Contract(limit: $limit, after: $after, filter: $filter) {
-                        id
-                        contractNumber
-                        signDate
-                        contractSum
-                        contractSumWnds
-                        faktSum
-                        supplierBiin
-                        descriptionRu
-                        finYear
-                        Supplier {
-                            nameRu
-                        }
-                        RefContractStatus {
-                            nameRu
-                        }
-                        RefSubjectType {
-                            nameRu
-                        }
-                        RefContractType {
-                            nameRu
-                        }
-                        FaktTradeMethods {
-                            nameRu
-                        }
-                        TrdBuy {
-                            numberAnno
-                        }
-                        ContractUnits {
-                            Plans {
-                                amount
-                            }
-                        }
-                    }
-                }
-            """,
-            "variables": {
-                "limit": PAGE_LIMIT,
-                "after": after,
-                "filter": {
-                    "customerBin": bin_company,
-                    "finYear": fin_year
-                }
-            }
-        }
-        
-        response = requests.post(f"{BASE_URL}/v3/graphql", json=query, headers=headers)
-        data = response.json()
-        
-        if "errors" in data:
-            print(f"Ошибка API: {data['errors']}")
-            break
-        
-        contracts = data.get("data", {}).get("Contract", [])
-        if not contracts:
-            break
-            
-        all_contracts.extend(contracts)
-        
-        page_info = data.get("extensions", {}).get("pageInfo", {})
-        if not page_info.get("hasNextPage", False):
-            break
-        after = page_info.get("lastId", 0)
-        
-        print(f"Загружено: {len(all_contracts)} договоров...")
-    
-    return all_contracts
+    pages = (list(map(parse_contract, contracts)) for contracts in paginate("Contract", filter, CONTRACT_FIELDS))
+    loaded = 0
+    for contracts in with_plan_amounts(pages):
+        yield from contracts
+        loaded += len(contracts)
+        print(f"Загружено: {loaded} договоров...")
+
+def get_contracts(bin_company, fin_year):
+    """Получение договоров через GraphQL (заказчик, по финансовому году)"""
+    return list(iter_contracts(bin_company, fin_year))
 
 def format_number(value):
     """Форматирование числа с 2 знаками после запятой"""
@@ -98,119 +55,147 @@ def format_number(value):
     except:
         return value
 
-def get_plan_amount(contract):
-    """Получение общей плановой суммы из предметов договора"""
-    units = contract.get("ContractUnits", [])
-    if not units:
-        return None
-    total = 0
-    for unit in units:
-        plans = unit.get("Plans")
-        if plans and plans.get("amount"):
-            total += plans.get("amount", 0)
-    return total if total > 0 else None
+# Порядок столбцов реестра договоров
+REGISTER_COLUMNS = [
+    "№",
+    "Номер договора в реестре договоров",
+    "Номер закупки",
+    "Описание",
+    "Вид предмета",
+    "Тип договора",
+    "Статус",
+    "Фактический способ закупки",
+    "Финансовый год",
+    "Общая плановая сумма договора",
+    "Сумма без НДС",
+    "Факт. сумма",
+    "Наименование поставщика",
+    "Дата заключения"
+]
 
-def save_to_excel(contracts, filename):
-    """Сохранение в Excel with форматированием"""
-    
-    # Порядок столбцов
-    columns = [
-        "№",
-        "Номер договора в реестре договоров",
-        "Номер закупки",
-        "Описание",
-        "Вид предмета",
-        "Тип договора",
-        "Статус",
-        "Фактический способ закупки",
-        "Финансовый год",
-        "Общая плановая сумма договора",
-        "Сумма без НДС",
-        "Факт. сумма",
-        "Наименование поставщика",
-        "Дата заключения"
-    ]
-    
-    rows = []
+def iter_register_rows(contracts):
+    """Строки реестра договоров из записей Contract (словари в порядке REGISTER_COLUMNS)"""
     for idx, c in enumerate(contracts, start=1):
-        rows.append({
+        yield {
             "№": idx,
-            "Номер договора в реестре договоров": c.get("contractNumber"),
-            "Номер закупки": c.get("TrdBuy", {}).get("numberAnno") if c.get("TrdBuy") else None,
-            "Описание": c.get("descriptionRu"),
-            "Вид предмета": c.get("RefSubjectType", {}).get("nameRu") if c.get("RefSubjectType") else None,
-            "Тип договора": c.get("RefContractType", {}).get("nameRu") if c.get("RefContractType") else None,
-            "Статус": c.get("RefContractStatus", {}).get("nameRu") if c.get("RefContractStatus") else None,
-            "Фактический способ закупки": c.get("FaktTradeMethods", {}).get("nameRu") if c.get("FaktTradeMethods") else None,
-            "Финансовый год": c.get("finYear"),
-            "Общая плановая сумма договора": format_number(get_plan_amount(c)),
-            "Сумма без НДС": format_number(c.get("contractSum")),
-            "Факт. сумма": format_number(c.get("faktSum")),
-            "Наименование поставщика": c.get("Supplier", {}).get("nameRu") if c.get("Supplier") else None,
-            "Дата заключения": c.get("signDate")[:10] if c.get("signDate") else None,
-        })
+            "Номер договора в реестре договоров": c.contract_number,
+            "Номер закупки": c.anno_number,
+            "Описание": c.description,
+            "Вид предмета": c.subject_type,
+            "Тип договора": c.contract_type,
+            "Статус": c.status_name,
+            "Фактический способ закупки": c.trade_method,
+            "Финансовый год": c.fin_year,
+            "Общая плановая сумма договора": format_number(c.plan_amount) if c.plan_amount > 0 else None,
+            "Сумма без НДС": format_number(c.contract_sum),
+            "Факт. сумма": format_number(c.fakt_sum),
+            "Наименование поставщика": c.supplier_name,
+            "Дата заключения": c.sign_date,
+        }
+
+def register_column_widths(contracts):
+    """Ширина колонок реестра по длине значений (как при автоподборе, не более 50)"""
+    max_lengths = [len(column) for column in REGISTER_COLUMNS]
+    for row in iter_register_rows(contracts):
+        for c_idx, value in enumerate(row.values()):
+            if value is not None:
+                length = len(str(value))
+                if length > max_lengths[c_idx]:
+                    max_lengths[c_idx] = length
+    return [min(length + 2, 50) for length in max_lengths]
+
+@metrics.timed("save_to_excel")
+def save_to_excel(contracts, filename):
+    """Сохранение в Excel with форматированием (потоковая запись, write-only режим openpyxl)"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, NamedStyle
+    from openpyxl.utils import get_column_letter
     
-    df = pd.DataFrame(rows, columns=columns)
+    # Список нужен для двух проходов: ширины колонок и запись строк
+    if not isinstance(contracts, list):
+        contracts = list(contracts)
     
     # Создаём книгу Excel
-    wb = Workbook()
-    ws = wb.active
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
     
-    # Стили
+    # Стили (общие именованные стили книги вместо объектов на каждую ячейку)
     font_normal = Font(name='Times New Roman', size=12)
     font_bold = Font(name='Times New Roman', size=12, bold=True)
     alignment_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
     alignment_left = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    wb.add_named_style(NamedStyle(name="register_header", font=font_bold, alignment=alignment_center))
+    wb.add_named_style(NamedStyle(name="register_text", font=font_normal, alignment=alignment_center))
+    wb.add_named_style(NamedStyle(name="register_description", font=font_normal, alignment=alignment_left))
+    wb.add_named_style(NamedStyle(name="register_sum", font=font_normal, alignment=alignment_center, number_format='#,##0.00'))
     
     # Индексы столбцов (1-based)
     description_col = 4  # "Описание"
     sum_cols = [10, 11, 12]  # "Общая плановая сумма договора", "Сумма без НДС", "Факт. сумма"
     
-    # Записываем данные
-    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-        for c_idx, value in enumerate(row, 1):
-            cell = ws.cell(row=r_idx, column=c_idx, value=value)
-            
-            # Выравнивание: Описание по левому краю (кроме заголовка)
-            if c_idx == description_col and r_idx > 1:
-                cell.alignment = alignment_left
-            else:
-                cell.alignment = alignment_center
-            
-            # Заголовки - жирный шрифт
-            if r_idx == 1:
-                cell.font = font_bold
-            else:
-                cell.font = font_normal
-            
-            # Числовой формат with разделителями разрядов
-            if c_idx in sum_cols and r_idx > 1:
-                cell.number_format = '#,##0.00'
+    # Стиль каждого столбца в строках данных
+    row_styles = []
+    for c_idx in range(1, len(REGISTER_COLUMNS) + 1):
+        if c_idx == description_col:
+            row_styles.append("register_description")
+        elif c_idx in sum_cols:
+            row_styles.append("register_sum")
+        else:
+            row_styles.append("register_text")
+    
+    # Автоширина колонок: в write-only режиме задаётся до первой строки
+    for c_idx, width in enumerate(register_column_widths(contracts), 1):
+        ws.column_dimensions[get_column_letter(c_idx)].width = width
     
-    # Автоширина колонок
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    # Заголовки - жирный шрифт
+    header = []
+    for column in REGISTER_COLUMNS:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.style = "register_header"
+        header.append(cell)
+    ws.append(header)
+    
+    # Записываем данные построчно
+    for row in iter_register_rows(contracts):
+        cells = []
+        for value, style in zip(row.values(), row_styles):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            cells.append(cell)
+        ws.append(cells)
     
     wb.save(filename)
     print(f"Сохранено: {filename}")
 
 if __name__ == "__main__":
-    print(f"Поиск договоров заказчика {BIN_COMPANY} за {FIN_YEAR} год...")
+    parser = argparse.ArgumentParser(description="Выгрузка договоров заказчика в Excel")
+    parser.add_argument("--sync", action="store_true", help="догрузить изменения в локальное хранилище и выгрузить реестр из него")
+    cache.add_arguments(parser)
+    checkpoint.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure(args)
+    checkpoint.configure(args)
+    metrics.configure(args)
+
+    print(f"Поиск договоров заказчика {config.BIN_COMPANY} за {config.FIN_YEAR} год...")
     
-    contracts = get_contracts(BIN_COMPANY, FIN_YEAR)
+    with metrics.stage("fetch_contracts"):
+        if args.sync:
+            from sync_contracts import sync_contracts
+            conn = store.connect()
+            fetched = sync_contracts(conn, config.BIN_COMPANY, config.FIN_YEAR)
+            print(f"Синхронизировано: {fetched} договоров")
+            contracts = store.load_contracts(conn, config.BIN_COMPANY, config.FIN_YEAR)
+            conn.close()
+        else:
+            contracts = get_contracts(config.BIN_COMPANY, config.FIN_YEAR)
     
     if contracts:
-        filename = os.path.join(REPORTS_DIR, f"contracts_{BIN_COMPANY}_{FIN_YEAR}.xlsx")
+        filename = report_path(f"contracts_{config.BIN_COMPANY}_{config.FIN_YEAR}.xlsx")
         save_to_excel(contracts, filename)
         print(f"\nГотово! Найдено договоров: {len(contracts)}")
     else:
         print("Договоры не найдены.")
+    metrics.finish()
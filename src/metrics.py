@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+import fastjson
+from config import report_path
+
+# Сбор метрик выполнения: запросы к API, этапы обработки, опциональное профилирование.
+# Включается флагом --metrics; без него хуки почти ничего не стоят.
+
+_enabled = False
+_profile = False
+_path = None
+_lock = threading.Lock()
+_started = None
+_requests = []
+_pages = {}
+_stages = {}
+_profiler = None
+
+def add_arguments(parser):
+    """Добавление флагов --metrics / --profile в argparse"""
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PATH",
+                        help="сохранить метрики выполнения в JSON (по умолчанию reports/metrics_<время>.json)")
+    parser.add_argument("--profile", action="store_true", help="дополнительно профилировать через cProfile (основной поток) и tracemalloc")
+
+def configure(args):
+    """Применение флагов командной строки"""
+    if args.metrics is not None or args.profile:
+        enable(args.metrics or None, args.profile)
+
+def enable(path=None, profile=False):
+    """Включение сбора метрик (и профилирования)"""
+    global _enabled, _profile, _path, _started, _profiler
+    _enabled = True
+    _profile = profile
+    _path = path
+    _started = time.time()
+    if profile:
+        import cProfile
+        import tracemalloc
+        tracemalloc.start()
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+def record_request(entity, latency, response_bytes, decode_seconds, retries=0, status=None, wire_bytes=None, encoding=None):
+    """Один HTTP-запрос к API (bytes - после распаковки, wire_bytes - при передаче, retries - 1 для повторной попытки)"""
+    if not _enabled:
+        return
+    with _lock:
+        _requests.append({
+            "entity": entity,
+            "latency": round(latency, 4),
+            "decode_seconds": round(decode_seconds, 4),
+            "bytes": response_bytes,
+            "wire_bytes": response_bytes if wire_bytes is None else wire_bytes,
+            "encoding": encoding,
+            "retries": retries,
+            "status": status
+        })
+
+def record_page(entity, rows):
+    """Одна полученная страница (из API или из кэша)"""
+    if not _enabled:
+        return
+    with _lock:
+        page = _pages.setdefault(entity, {"pages": 0, "rows": 0, "cache_hits": 0})
+        page["pages"] += 1
+        page["rows"] += rows
+
+def record_cache_hit(entity):
+    """Ответ взят из локального кэша без обращения к API"""
+    if not _enabled:
+        return
+    with _lock:
+        page = _pages.setdefault(entity, {"pages": 0, "rows": 0, "cache_hits": 0})
+        page["cache_hits"] += 1
+
+@contextmanager
+def stage(name):
+    """Замер времени этапа (вложенные и параллельные этапы считаются отдельно)"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            s = _stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            s["calls"] += 1
+            s["seconds"] += elapsed
+
+def timed(name):
+    """Декоратор: замер времени функции как этапа"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def summary():
+    """Сводка метрик в виде словаря"""
+    latencies = [r["latency"] for r in _requests]
+    by_entity = {}
+    for r in _requests:
+        e = by_entity.setdefault(r["entity"] or "-", {"requests": 0, "latency": 0.0, "decode_seconds": 0.0, "bytes": 0, "wire_bytes": 0, "retries": 0})
+        e["requests"] += 1
+        e["latency"] += r["latency"]
+        e["decode_seconds"] += r["decode_seconds"]
+        e["bytes"] += r["bytes"]
+        e["wire_bytes"] += r["wire_bytes"]
+        e["retries"] += r["retries"]
+    return {
+        "run": {
+            "argv": sys.argv,
+            "started": datetime.fromtimestamp(_started).isoformat(timespec="seconds") if _started else None,
+            "seconds": round(time.time() - _started, 3) if _started else None
+        },
+        "stages": {name: {"calls": s["calls"], "seconds": round(s["seconds"], 4)} for name, s in _stages.items()},
+        "requests": {
+            "count": len(_requests),
+            "latency_total": round(sum(latencies), 4),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_max": max(latencies) if latencies else None,
+            "decode_seconds": round(sum(r["decode_seconds"] for r in _requests), 4),
+            "bytes": sum(r["bytes"] for r in _requests),
+            "wire_bytes": sum(r["wire_bytes"] for r in _requests),
+            "json_decoder": fastjson.name(),
+            "retries": sum(r["retries"] for r in _requests),
+            "by_entity": by_entity,
+            "items": _requests
+        },
+        "pages": _pages
+    }
+
+def _profile_summary(path):
+    """Остановка профилировщиков: .prof рядом с метриками, топ функций и аллокаций в JSON"""
+    import pstats
+    import tracemalloc
+    _profiler.disable()
+    prof_path = os.path.splitext(path)[0] + ".prof"
+    _profiler.dump_stats(prof_path)
+    stats = pstats.Stats(_profiler)
+    top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:30]
+    functions = [
+        {"function": f"{func[0]}:{func[1]}({func[2]})", "calls": data[1], "tottime": round(data[2], 4), "cumtime": round(data[3], 4)}
+        for func, data in top
+    ]
+    current, peak = tracemalloc.get_traced_memory()
+    allocations = [
+        {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:20]
+    ]
+    tracemalloc.stop()
+    return {"cprofile_file": prof_path, "top_cumulative": functions, "memory_peak": peak, "memory_current": current, "top_allocations": allocations}
+
+def finish():
+    """Запись метрик в JSON (если сбор включён); возвращает путь к файлу"""
+    if not _enabled:
+        return None
+    path = _path or report_path(f"metrics_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    result = summary()
+    if _profile:
+        result["profile"] = _profile_summary(path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Метрики сохранены: {path}")
+    return path
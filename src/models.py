@@ -0,0 +1,103 @@
+import sys
+from dataclasses import dataclass
+import references
+
+# Компактные записи вместо вложенных словарей ответа API: плановая сумма
+# считается один раз при разборе, справочные названия берутся из локальных
+# справочников (одна строка в памяти на все договоры с тем же значением).
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _name(record, key):
+    """nameRu вложенного справочника (None, если справочник не заполнен)"""
+    ref = record.get(key)
+    return _intern(ref.get("nameRu")) if ref else None
+
+def _ref(record, reference, id_key, nested_key):
+    """Название из локального справочника по id (или из вложенного объекта, если он запрошен)"""
+    if record.get(nested_key):
+        return _name(record, nested_key)
+    return references.name(reference, record.get(id_key))
+
+def _float(value):
+    return float(value) if value is not None else None
+
+def get_plan_amount(contract):
+    """Общая плановая сумма из предметов договора (ContractUnits -> Plans)"""
+    total = 0
+    for unit in contract.get("ContractUnits") or []:
+        plans = unit.get("Plans")
+        if plans and plans.get("amount"):
+            total += plans["amount"]
+    return float(total)
+
+@dataclass(slots=True)
+class Contract:
+    id: int
+    contract_number: str = None
+    sign_date: str = None
+    fin_year: int = None
+    status_id: int = None
+    type_id: int = None
+    subject_type_id: int = None
+    trade_method_id: int = None
+    contract_sum: float = None
+    contract_sum_wnds: float = None
+    fakt_sum: float = None
+    plan_amount: float = 0.0
+    supplier_biin: str = None
+    supplier_name: str = None
+    status_name: str = None
+    subject_type: str = None
+    contract_type: str = None
+    trade_method: str = None
+    anno_number: str = None
+    description: str = None
+
+@dataclass(slots=True)
+class Announcement:
+    id: int
+    number_anno: str = None
+    name: str = None
+    publish_date: str = None
+    total_sum: float = None
+    trade_method_id: int = None
+    trade_method: str = None
+
+def parse_contract(c):
+    """Запись Contract из ответа API"""
+    return Contract(
+        id=c["id"],
+        contract_number=c.get("contractNumber"),
+        sign_date=c["signDate"][:10] if c.get("signDate") else None,
+        fin_year=c.get("finYear"),
+        status_id=c.get("refContractStatusId"),
+        type_id=c.get("refContractTypeId"),
+        subject_type_id=c.get("refSubjectTypeId"),
+        trade_method_id=c.get("faktTradeMethodsId"),
+        contract_sum=_float(c.get("contractSum")),
+        contract_sum_wnds=_float(c.get("contractSumWnds")),
+        fakt_sum=_float(c.get("faktSum")),
+        plan_amount=get_plan_amount(c),
+        supplier_biin=c.get("supplierBiin"),
+        supplier_name=_name(c, "Supplier"),
+        status_name=_ref(c, "contract_statuses", "refContractStatusId", "RefContractStatus"),
+        subject_type=_ref(c, "subject_types", "refSubjectTypeId", "RefSubjectType"),
+        contract_type=_ref(c, "contract_types", "refContractTypeId", "RefContractType"),
+        trade_method=_ref(c, "trade_methods", "faktTradeMethodsId", "FaktTradeMethods"),
+        anno_number=c["TrdBuy"].get("numberAnno") if c.get("TrdBuy") else None,
+        description=c.get("descriptionRu")
+    )
+
+def parse_announcement(a):
+    """Запись Announcement из ответа API (TrdBuy)"""
+    return Announcement(
+        id=a["id"],
+        number_anno=a.get("numberAnno"),
+        name=a.get("nameRu"),
+        publish_date=a["publishDate"][:10] if a.get("publishDate") else None,
+        total_sum=_float(a.get("totalSum")),
+        trade_method_id=a.get("refTradeMethodsId"),
+        trade_method=_ref(a, "trade_methods", "refTradeMethodsId", "RefTradeMethods")
+    )
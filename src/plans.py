@@ -0,0 +1,76 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import config
+from config import PAGE_LIMIT
+import cache
+import metrics
+from api_client import ApiError, build_query, post
+from models import get_plan_amount
+
+# Плановые суммы договоров загружаются второй фазой: обход по курсору запрашивает
+# только заголовки договоров, а тяжёлая выборка ContractUnits { Plans { amount } }
+# выполняется параллельно пачками по id (до PAGE_LIMIT договоров на запрос).
+# Итоговая сумма по каждому договору кэшируется (cache.get_plan_amounts).
+
+PLAN_FIELDS = ("id", "ContractUnits.Plans.amount")
+
+def fetch_batch(ids):
+    """Один запрос плановых сумм для пачки id: {id: сумма}"""
+    data = post(build_query("Contract", PLAN_FIELDS), {"limit": PAGE_LIMIT, "after": 0, "filter": {"id": ids}}, "Plans")
+    if "errors" in data:
+        raise ApiError(f"Ошибка API (Plans): {data['errors']}")
+    records = (data.get("data") or {}).get("Contract") or []
+    metrics.record_page("Plans", len(records))
+    return {c["id"]: float(get_plan_amount(c)) for c in records}
+
+def fetch_plan_amounts(ids):
+    """Плановые суммы договоров {id: сумма}: из кэша, недостающие - пачками с портала"""
+    amounts = cache.get_plan_amounts(ids)
+    missing = [i for i in ids if i not in amounts]
+    for start in range(0, len(missing), PAGE_LIMIT):
+        fetched = fetch_batch(missing[start:start + PAGE_LIMIT])
+        cache.put_plan_amounts(fetched)
+        amounts.update(fetched)
+    return amounts
+
+class PlanLoader:
+    """Вторая фаза выгрузки: страницы записей Contract получают plan_amount в фоне
+
+    submit() ставит загрузку сумм страницы в очередь и сразу возвращается,
+    done() отдаёт страницы с заполненными суммами в порядке поступления.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or config.MAX_PARALLEL_REQUESTS
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.pending = deque()
+
+    def submit(self, records):
+        self.pending.append((records, self.executor.submit(fetch_plan_amounts, [c.id for c in records])))
+
+    def done(self, keep=0):
+        """Готовые страницы (ожидание по порядку), пока в очереди больше keep страниц"""
+        while len(self.pending) > keep:
+            records, future = self.pending.popleft()
+            amounts = future.result()
+            for c in records:
+                c.plan_amount = amounts.get(c.id, 0.0)
+            yield records
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+def with_plan_amounts(pages, max_workers=None):
+    """Поток страниц записей Contract -> те же страницы с plan_amount
+
+    Следующая страница заголовков запрашивается, пока загружаются суммы
+    предыдущих; в очереди не больше max_workers страниц.
+    """
+    loader = PlanLoader(max_workers)
+    try:
+        for records in pages:
+            loader.submit(records)
+            yield from loader.done(keep=loader.max_workers)
+        yield from loader.done()
+    finally:
+        loader.close()
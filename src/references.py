@@ -0,0 +1,103 @@
+import sys
+import time
+import threading
+import cache
+from config import CACHE_TTL, PAGE_LIMIT
+
+# Справочники портала (статусы, виды предмета, типы договоров, способы закупки).
+# Выгрузки запрашивают только id (refContractStatusId, faktTradeMethodsId, ...),
+# а названия подставляются отсюда. Справочники загружаются одним запросом и
+# хранятся в кэше ответов API (TTL - CACHE_TTL["References"]); в памяти процесса
+# они живут столько же и затем перечитываются. При появлении неизвестного id
+# справочники перечитываются с портала, но не чаще раза в REFRESH_INTERVAL секунд.
+
+# Имя справочника -> сущность GraphQL
+REFERENCES = {
+    "contract_statuses": "RefContractStatus",
+    "subject_types": "RefSubjectType",
+    "contract_types": "RefContractType",
+    "trade_methods": "RefTradeMethods",
+}
+
+# Минимальный интервал между внеочередными обновлениями (неизвестный id), секунды
+REFRESH_INTERVAL = 600
+
+_names = None
+_loaded_at = 0.0
+_refreshed_at = None
+_lock = threading.Lock()
+
+def build_query():
+    """Запрос всех справочников: по псевдониму на справочник"""
+    roots = "".join(f"""
+            {alias}: {entity}(limit: $limit) {{
+                id
+                nameRu
+            }}""" for alias, entity in REFERENCES.items())
+    return f"""
+        query($limit: Int) {{{roots}
+        }}
+    """
+
+def _load(fresh):
+    """Справочники {имя: {id: nameRu}} из кэша ответов или, при fresh, с портала"""
+    from api_client import ApiError, graphql, post
+    query, variables = build_query(), {"limit": PAGE_LIMIT}
+    if fresh:
+        data = post(query, variables, "References")
+        if "errors" not in data:
+            cache.put("References", query, variables, data)
+    else:
+        data = graphql(query, variables, "References")
+    if "errors" in data:
+        raise ApiError(f"Ошибка API (справочники): {data['errors']}")
+    return _parse(data)
+
+def _parse(data):
+    """Ответ API -> {имя справочника: {id: nameRu}}"""
+    rows = data.get("data") or {}
+    return {
+        alias: {r["id"]: sys.intern(r["nameRu"]) for r in rows.get(alias) or [] if r.get("nameRu")}
+        for alias in REFERENCES
+    }
+
+def names(reference):
+    """Справочник {id: nameRu} (загружается при первом обращении и по истечении TTL)"""
+    global _names, _loaded_at
+    with _lock:
+        if _names is None or time.time() - _loaded_at > CACHE_TTL["References"]:
+            _names = _load(fresh=False)
+            _loaded_at = time.time()
+        return _names[reference]
+
+def cached_names(reference):
+    """Справочник {id: nameRu} без обращения к порталу: из памяти процесса или кэша ответов ({}, если их нет)
+
+    Для чтения из локального хранилища: справочник в памяти используется и после
+    истечения TTL, а при его отсутствии портал не запрашивается.
+    """
+    global _names, _loaded_at
+    with _lock:
+        if _names is None:
+            data = cache.get("References", build_query(), {"limit": PAGE_LIMIT})
+            if data is None or "errors" in data:
+                return {}
+            _names = _parse(data)
+            _loaded_at = time.time()
+        return _names[reference]
+
+def name(reference, ref_id):
+    """Название по id (None, если id не указан или не найден и после обновления справочников)"""
+    global _names, _loaded_at, _refreshed_at
+    if ref_id is None:
+        return None
+    value = names(reference).get(ref_id)
+    if value is None:
+        with _lock:
+            now = time.time()
+            if _refreshed_at is None or now - _refreshed_at >= REFRESH_INTERVAL:
+                _refreshed_at = now
+                _names = _load(fresh=True)
+                _loaded_at = now
+            value = _names[reference].get(ref_id)
+    return value
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import config
+from config import CONTRACT_STATUSES, TERMINATED_STATUSES
+import cache
+import store
+from generate_report import get_quarter_dates, report_filename, write_report
+from sync_contracts import sync_announcements, sync_contracts
+
+# Локальный HTTP-сервис отчётов для дашбордов. Данные берутся из локального
+# хранилища (store.py), вычисленные отчёты держатся в LRU в памяти. Фоновый
+# поток периодически синхронизирует хранилище с порталом по парам (БИН, год),
+# отчёты которых ещё в LRU, и пересчитывает эти отчёты, поэтому частые опросы не
+# обращаются к API.
+#
+#   GET  /report?bin=...&year=...&quarter=...       - агрегаты отчёта в JSON
+#   GET  /report.xlsx?bin=...&year=...&quarter=...  - Excel-отчёт (формируется по запросу)
+#   POST /refresh?bin=...&year=...                  - синхронизация и пересчёт немедленно
+#   GET  /health                                    - состояние сервиса
+
+class ReportCache:
+    """LRU вычисленных отчётов: {(БИН, год, квартал): результат}"""
+
+    def __init__(self, max_size):
+        self.max_size = max(1, max_size)
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def keys(self):
+        with self.lock:
+            return list(self.items)
+
+class ReportService:
+    """Отчёты по хранилищу: LRU, синхронизация по требованию и в фоне"""
+
+    def __init__(self, cache_size=256, refresh_interval=900):
+        self.reports = ReportCache(cache_size)
+        self.refresh_interval = refresh_interval
+        self.pairs = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.refresher = threading.Thread(target=self.refresh_loop, daemon=True)
+
+    def pair(self, bin_company, fin_year):
+        """Состояние пары (БИН, год); её блокировка не даёт синхронизации и записи отчёта идти одновременно"""
+        with self.lock:
+            return self.pairs.setdefault((bin_company, fin_year), {"lock": threading.Lock(), "synced_at": None})
+
+    def sync(self, bin_company, fin_year, force=False):
+        """Синхронизация хранилища для пары (при первом обращении - только если пара ещё не загружалась)"""
+        pair = self.pair(bin_company, fin_year)
+        with pair["lock"]:
+            conn = store.connect()
+            try:
+                if force or (pair["synced_at"] is None and not store.get_last_id(conn, bin_company, fin_year)):
+                    sync_contracts(conn, bin_company, fin_year)
+                    sync_announcements(conn, bin_company, fin_year)
+                    pair["synced_at"] = time.time()
+            finally:
+                conn.close()
+
+    def compute(self, bin_company, fin_year, quarter):
+        """Расчёт отчёта запросами SQL к хранилищу"""
+        date_from, date_to = get_quarter_dates(fin_year, quarter) if quarter else (None, None)
+        conn = store.connect()
+        try:
+            return {
+                "aggregates": store.aggregate_contracts(conn, bin_company, fin_year, CONTRACT_STATUSES, date_from, date_to),
+                "terminated": store.count_contracts_by_status(conn, bin_company, fin_year, TERMINATED_STATUSES, date_from, date_to),
+                "announcements": store.count_announcements_by_method(conn, bin_company, *get_quarter_dates(fin_year, quarter)),
+                "computed_at": time.time()
+            }
+        finally:
+            conn.close()
+
+    def report(self, bin_company, fin_year, quarter):
+        """Отчёт из LRU или расчёт (с синхронизацией, если пара ещё не загружалась)"""
+        key = (bin_company, fin_year, quarter)
+        result = self.reports.get(key)
+        if result is None:
+            self.sync(bin_company, fin_year)
+            result = self.compute(bin_company, fin_year, quarter)
+            self.reports.put(key, result)
+        return result
+
+    def refresh(self, bin_company, fin_year):
+        """Синхронизация пары и пересчёт её отчётов, находящихся в LRU"""
+        self.sync(bin_company, fin_year, force=True)
+        for key in self.reports.keys():
+            if key[:2] == (bin_company, fin_year):
+                self.reports.put(key, self.compute(*key))
+
+    def active_pairs(self):
+        """Пары, отчёты которых ещё в LRU; остальные удаляются из pairs и больше не обновляются"""
+        cached = {key[:2] for key in self.reports.keys()}
+        with self.lock:
+            for key in [key for key in self.pairs if key not in cached]:
+                del self.pairs[key]
+            return list(self.pairs)
+
+    def refresh_loop(self):
+        """Фоновое обновление пар с отчётами в LRU раз в refresh_interval секунд"""
+        while not self.stopped.wait(self.refresh_interval):
+            for bin_company, fin_year in self.active_pairs():
+                try:
+                    self.refresh(bin_company, fin_year)
+                except Exception as e:
+                    print(f"Ошибка фонового обновления {bin_company} / {fin_year}: {e}")
+
+    def workbook(self, bin_company, fin_year, quarter):
+        """Excel-отчёт по данным из LRU (файл в REPORTS_DIR); None, если договоров нет"""
+        result = self.report(bin_company, fin_year, quarter)
+        if not result["aggregates"][3]["count"]:
+            return None
+        filename = report_filename(fin_year, quarter, bin_company)
+        with self.pair(bin_company, fin_year)["lock"]:
+            write_report(result["aggregates"], filename, result["terminated"], result["announcements"],
+                         get_quarter_dates(fin_year, quarter), fin_year, quarter)
+            with open(filename, "rb") as f:
+                return f.read()
+
+def to_json(bin_company, fin_year, quarter, result):
+    """Отчёт в формате ответа /report"""
+    methods_data, methods_types_data, types_data, totals = result["aggregates"]
+    return {
+        "bin": bin_company,
+        "fin_year": fin_year,
+        "quarter": quarter,
+        "period": get_quarter_dates(fin_year, quarter),
+        "methods": methods_data,
+        "methods_types": methods_types_data,
+        "types": types_data,
+        "totals": totals,
+        "terminated": result["terminated"],
+        "announcements": result["announcements"],
+        "computed_at": datetime.fromtimestamp(result["computed_at"]).isoformat(timespec="seconds")
+    }
+
+def parse_params(query, with_quarter=True):
+    """БИН, год и квартал из строки запроса (ValueError при некорректных значениях)"""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    bin_company = params.get("bin", config.BIN_COMPANY)
+    if not re.fullmatch(r"\d{12}", bin_company):
+        raise ValueError(f"bin должен состоять из 12 цифр: {bin_company!r}")
+    fin_year = int(params.get("year", config.FIN_YEAR))
+    if not 2000 <= fin_year <= 2100:
+        raise ValueError(f"year вне допустимого диапазона: {fin_year}")
+    if not with_quarter:
+        return bin_company, fin_year
+    quarter = int(params.get("quarter") or 0)
+    if quarter not in (0, 1, 2, 3, 4):
+        raise ValueError(f"quarter должен быть от 0 до 4: {quarter}")
+    return bin_company, fin_year, quarter or None
+
+def make_handler(service):
+    """Класс обработчика HTTP-запросов для сервиса"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            print(f"{self.address_string()} - {format % args}")
+
+        def send_body(self, status, body, content_type, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, status, data):
+            self.send_body(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+        def handle_request(self, method):
+            url = urlparse(self.path)
+            try:
+                if method == "GET" and url.path == "/health":
+                    self.send_json(200, {"status": "ok", "cached_reports": len(service.reports.keys())})
+                elif method == "GET" and url.path == "/report":
+                    params = parse_params(url.query)
+                    self.send_json(200, to_json(*params, service.report(*params)))
+                elif method == "GET" and url.path == "/report.xlsx":
+                    params = parse_params(url.query)
+                    body = service.workbook(*params)
+                    if body is None:
+                        self.send_json(404, {"error": "договоры не найдены"})
+                    else:
+                        filename = os.path.basename(report_filename(params[1], params[2], params[0]))
+                        self.send_body(200, body, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                       {"Content-Disposition": f'attachment; filename="{filename}"'})
+                elif method == "POST" and url.path == "/refresh":
+                    service.refresh(*parse_params(url.query, with_quarter=False))
+                    self.send_json(200, {"status": "ok"})
+                else:
+                    self.send_json(404, {"error": f"неизвестный адрес: {method} {url.path}"})
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+            except Exception as e:
+                self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+    return Handler
+
+def serve(host="127.0.0.1", port=8080, cache_size=256, refresh_interval=900):
+    """Запуск сервиса (блокирует до Ctrl+C)"""
+    service = ReportService(cache_size, refresh_interval)
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    service.refresher.start()
+    print(f"Сервис отчётов: http://{host}:{httpd.server_port} (обновление раз в {refresh_interval} с)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Остановка сервиса.")
+    finally:
+        service.stopped.set()
+        httpd.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальный HTTP-сервис отчётов по хранилищу договоров")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="порт (по умолчанию 8080)")
+    parser.add_argument("--cache-size", type=int, default=256, help="число отчётов в кэше в памяти")
+    parser.add_argument("--refresh-interval", type=int, default=900, help="период фоновой синхронизации, секунды")
+    args = parser.parse_args()
+
+    # Актуальность данных обеспечивает синхронизация хранилища, кэш ответов API не нужен
+    cache.set_mode(cache.MODE_OFF)
+    serve(args.host, args.port, args.cache_size, args.refresh_interval)
@@ -0,0 +1,262 @@
+import os
+import time
+import sqlite3
+import argparse
+import fastjson
+import references
+from config import DATA_DIR
+from models import parse_contract
+
+# Локальное хранилище договоров и объявлений. Кроме исходного ответа API
+# (payload) у договора хранятся разобранные столбцы для запросов SQL:
+# отчёт (--from-store) и произвольные выборки аналитиков работают по индексам
+# без обращения к порталу. Названия из справочников (trade_method, subject_type)
+# сохраняются на момент записи, поэтому отчёт группирует по id и берёт названия
+# из уже загруженных справочников (references.cached_names) без обращения к порталу.
+
+# Версия схемы (PRAGMA user_version); при обновлении столбцы добавляются
+# и заполняются из payload уже сохранённых договоров
+SCHEMA_VERSION = 1
+
+# Разобранные столбцы договора: имя -> (тип, атрибут записи Contract)
+CONTRACT_COLUMNS = {
+    "sign_date": ("TEXT", "sign_date"),
+    "type_id": ("INTEGER", "type_id"),
+    "trade_method_id": ("INTEGER", "trade_method_id"),
+    "trade_method": ("TEXT", "trade_method"),
+    "subject_type_id": ("INTEGER", "subject_type_id"),
+    "subject_type": ("TEXT", "subject_type"),
+    "supplier_biin": ("TEXT", "supplier_biin"),
+    "supplier_name": ("TEXT", "supplier_name"),
+    "contract_sum": ("REAL", "contract_sum"),
+    "fakt_sum": ("REAL", "fakt_sum"),
+    "plan_amount": ("REAL", "plan_amount"),
+}
+
+def connect():
+    """Открытие локального хранилища (создаёт таблицы и индексы при первом запуске)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(DATA_DIR, "contracts.sqlite"))
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS contracts (
+            id INTEGER PRIMARY KEY,
+            customer_bin TEXT NOT NULL,
+            fin_year INTEGER NOT NULL,
+            status_id INTEGER,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS announcements (
+            id INTEGER PRIMARY KEY,
+            customer_bin TEXT NOT NULL,
+            number_anno TEXT,
+            name TEXT,
+            publish_date TEXT,
+            total_sum REAL,
+            trade_method_id INTEGER,
+            trade_method TEXT
+        );
+        CREATE TABLE IF NOT EXISTS sync_state (
+            customer_bin TEXT NOT NULL,
+            fin_year INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            synced_at REAL NOT NULL,
+            PRIMARY KEY (customer_bin, fin_year)
+        );
+    """)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        migrate(conn)
+    return conn
+
+def migrate(conn):
+    """Добавление разобранных столбцов договоров и индексов (заполняются из payload)"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(contracts)")}
+    for name, (sql_type, _) in CONTRACT_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE contracts ADD COLUMN {name} {sql_type}")
+    records = [parse_contract(fastjson.loads(payload)) for (payload,) in conn.execute("SELECT payload FROM contracts")]
+    if records:
+        print(f"Обновление хранилища: разбор {len(records)} сохранённых договоров...")
+        conn.executemany(
+            f"UPDATE contracts SET {', '.join(f'{name} = ?' for name in CONTRACT_COLUMNS)} WHERE id = ?",
+            [(*contract_values(r), r.id) for r in records]
+        )
+    conn.executescript(f"""
+        CREATE INDEX IF NOT EXISTS idx_contracts_bin_year ON contracts(customer_bin, fin_year, status_id);
+        CREATE INDEX IF NOT EXISTS idx_contracts_status ON contracts(status_id);
+        CREATE INDEX IF NOT EXISTS idx_contracts_method ON contracts(trade_method_id);
+        CREATE INDEX IF NOT EXISTS idx_contracts_supplier ON contracts(supplier_biin);
+        CREATE INDEX IF NOT EXISTS idx_contracts_sign_date ON contracts(sign_date);
+        CREATE INDEX IF NOT EXISTS idx_announcements_bin_date ON announcements(customer_bin, publish_date);
+        CREATE INDEX IF NOT EXISTS idx_announcements_method ON announcements(trade_method_id);
+        PRAGMA user_version = {SCHEMA_VERSION};
+    """)
+    conn.commit()
+
+def contract_values(record):
+    """Значения разобранных столбцов для записи Contract (в порядке CONTRACT_COLUMNS)"""
+    return tuple(getattr(record, attr) for _, attr in CONTRACT_COLUMNS.values())
+
+def get_last_id(conn, bin_company, fin_year):
+    """Максимальный id договора, уже загруженный для пары (БИН, год)"""
+    row = conn.execute(
+        "SELECT last_id FROM sync_state WHERE customer_bin = ? AND fin_year = ?", (bin_company, fin_year)
+    ).fetchone()
+    return row[0] if row else 0
+
+def set_last_id(conn, bin_company, fin_year, last_id):
+    """Сохранение отметки синхронизации для пары (БИН, год)"""
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (customer_bin, fin_year, last_id, synced_at) VALUES (?, ?, ?, ?)",
+        (bin_company, fin_year, last_id, time.time())
+    )
+    conn.commit()
+
+def get_ids(conn, bin_company, fin_year, statuses):
+    """id договоров пары (БИН, год) с одним из указанных статусов (по возрастанию)"""
+    placeholders = ", ".join("?" for _ in statuses)
+    return [row[0] for row in conn.execute(
+        f"SELECT id FROM contracts WHERE customer_bin = ? AND fin_year = ? AND status_id IN ({placeholders}) ORDER BY id",
+        (bin_company, fin_year, *statuses)
+    )]
+
+def save_contracts(conn, bin_company, fin_year, contracts):
+    """Добавление или обновление договоров (ответ API) в хранилище"""
+    columns = ", ".join(CONTRACT_COLUMNS)
+    placeholders = ", ".join("?" for _ in CONTRACT_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO contracts (id, customer_bin, fin_year, status_id, payload, {columns}) "
+        f"VALUES (?, ?, ?, ?, ?, {placeholders})",
+        [
+            (c["id"], bin_company, fin_year, c.get("refContractStatusId"), fastjson.dumps(c), *contract_values(parse_contract(c)))
+            for c in contracts
+        ]
+    )
+    conn.commit()
+
+def save_announcements(conn, bin_company, date_from, date_to, announcements):
+    """Замена объявлений заказчика за период публикации (записи Announcement)"""
+    conn.execute(
+        "DELETE FROM announcements WHERE customer_bin = ? AND publish_date BETWEEN ? AND ?",
+        (bin_company, date_from, date_to)
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO announcements (id, customer_bin, number_anno, name, publish_date, total_sum, trade_method_id, trade_method) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (a.id, bin_company, a.number_anno, a.name, a.publish_date, a.total_sum, a.trade_method_id, a.trade_method)
+            for a in announcements
+        ]
+    )
+    conn.commit()
+
+def count_contracts(conn, bin_company, fin_year):
+    """Количество договоров пары (БИН, год) в хранилище"""
+    return conn.execute(
+        "SELECT COUNT(*) FROM contracts WHERE customer_bin = ? AND fin_year = ?", (bin_company, fin_year)
+    ).fetchone()[0]
+
+def load_contracts(conn, bin_company, fin_year, statuses=None):
+    """Чтение договоров из хранилища в виде записей Contract (опционально только с указанными статусами)"""
+    sql = "SELECT payload FROM contracts WHERE customer_bin = ? AND fin_year = ?"
+    params = [bin_company, fin_year]
+    if statuses:
+        sql += f" AND status_id IN ({', '.join('?' for _ in statuses)})"
+        params.extend(statuses)
+    return [parse_contract(fastjson.loads(payload)) for (payload,) in conn.execute(sql + " ORDER BY id", params)]
+
+def _period(sql, params, column, date_from, date_to):
+    """Условие на период по столбцу даты (если период задан)"""
+    if date_from:
+        sql += f" AND {column} BETWEEN ? AND ?"
+        params.extend((date_from, date_to))
+    return sql, params
+
+def _ref_name(names, ref_id, saved_name):
+    """Название по id из справочника на момент чтения, иначе сохранённое при записи
+
+    names - references.cached_names(...): чтение хранилища не обращается к порталу,
+    поэтому без загруженного справочника (или для договора без id) используется
+    сохранённое название.
+    """
+    return names.get(ref_id) or saved_name or "Не указан"
+
+def aggregate_contracts(conn, bin_company, fin_year, statuses, date_from=None, date_to=None):
+    """Агрегаты отчёта запросом SQL - результат в формате aggregate_data
+
+    Группы упорядочены по наименьшему id договора, то есть по первому появлению
+    при выгрузке по курсору, как в aggregate_data. Группировка идёт по id
+    справочников и сохранённым названиям; группы с одинаковым итоговым
+    названием объединяются.
+    """
+    sql, params = _period(
+        f"""SELECT trade_method_id, NULLIF(trade_method, ''), subject_type_id, NULLIF(subject_type, ''), COUNT(*),
+                   SUM(COALESCE(plan_amount, 0)), SUM(COALESCE(contract_sum, 0)),
+                   SUM(CASE WHEN fakt_sum > 0 THEN fakt_sum ELSE COALESCE(contract_sum, 0) END)
+            FROM contracts WHERE customer_bin = ? AND fin_year = ? AND status_id IN ({', '.join('?' for _ in statuses)})""",
+        [bin_company, fin_year, *statuses], "sign_date", date_from, date_to
+    )
+    rows = conn.execute(sql + " GROUP BY 1, 2, 3, 4 ORDER BY MIN(id)", params).fetchall()
+
+    methods_data = {}
+    methods_types_data = {}
+    types_data = {}
+    totals = {"plan_sum": 0.0, "contract_sum": 0.0, "actual_sum": 0.0, "count": 0}
+    trade_methods, subject_types = references.cached_names("trade_methods"), references.cached_names("subject_types")
+    for method_id, method, type_id, subject_type, count, plan_sum, contract_sum, actual_sum in rows:
+        method = _ref_name(trade_methods, method_id, method)
+        subject_type = _ref_name(subject_types, type_id, subject_type)
+        m = methods_data.setdefault(method, {"plan_sum": 0.0, "contract_sum": 0.0, "actual_sum": 0.0, "count": 0})
+        mt = methods_types_data.setdefault(method, {}).setdefault(subject_type, {"count": 0, "sum": 0.0})
+        mt["count"] += count
+        mt["sum"] += contract_sum
+        types_data[subject_type] = types_data.get(subject_type, 0.0) + contract_sum
+        for data in (m, totals):
+            data["plan_sum"] += plan_sum
+            data["contract_sum"] += contract_sum
+            data["actual_sum"] += actual_sum
+            data["count"] += count
+    totals["economy"] = totals["plan_sum"] - totals["actual_sum"]
+    return methods_data, methods_types_data, types_data, totals
+
+def count_contracts_by_status(conn, bin_company, fin_year, statuses, date_from=None, date_to=None):
+    """Число договоров с указанными статусами (период - по дате подписания)"""
+    sql, params = _period(
+        f"SELECT COUNT(*) FROM contracts WHERE customer_bin = ? AND fin_year = ? AND status_id IN ({', '.join('?' for _ in statuses)})",
+        [bin_company, fin_year, *statuses], "sign_date", date_from, date_to
+    )
+    return conn.execute(sql, params).fetchone()[0]
+
+def count_announcements_by_method(conn, bin_company, date_from, date_to):
+    """Объявления заказчика за период публикации по способам закупки (в порядке первого появления)"""
+    rows = conn.execute(
+        """SELECT trade_method_id, NULLIF(trade_method, ''), COUNT(*)
+           FROM announcements WHERE customer_bin = ? AND publish_date BETWEEN ? AND ?
+           GROUP BY 1, 2 ORDER BY MIN(id)""",
+        (bin_company, date_from, date_to)
+    ).fetchall()
+    counts = {}
+    trade_methods = references.cached_names("trade_methods")
+    for method_id, method, count in rows:
+        method = _ref_name(trade_methods, method_id, method)
+        counts[method] = counts.get(method, 0) + count
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запрос SQL к локальному хранилищу договоров и объявлений")
+    parser.add_argument("sql", help='например: "SELECT id, contract_sum FROM contracts WHERE supplier_biin = \'...\'"')
+    parser.add_argument("params", nargs="*", help="значения параметров ? в запросе")
+    args = parser.parse_args()
+
+    conn = connect()
+    # ref_name('trade_methods', trade_method_id) - название по справочнику из кэша ответов (без обращения к порталу)
+    conn.create_function("ref_name", 2, lambda reference, ref_id: references.cached_names(reference).get(ref_id))
+    start = time.perf_counter()
+    cursor = conn.execute(args.sql, args.params)
+    rows = cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    if cursor.description:
+        print(" | ".join(column[0] for column in cursor.description))
+        for row in rows:
+            print(" | ".join("" if value is None else str(value) for value in row))
+    print(f"\nСтрок: {len(rows)}, {elapsed * 1000:.1f} мс")
+    conn.close()
@@ -0,0 +1,71 @@
+import argparse
+import config
+from config import OPEN_STATUSES, PAGE_LIMIT
+import cache
+import store
+from api_client import paginate
+from get_contracts import CONTRACT_FIELDS
+from get_announcements import iter_announcements
+from plans import PLAN_FIELDS
+
+# В хранилище сохраняется ответ API целиком, поэтому плановые суммы
+# запрашиваются вместе с договором (без второй фазы); БИН поставщика нужен
+# для выборок по поставщику
+SYNC_FIELDS = CONTRACT_FIELDS + ("supplierBiin",) + PLAN_FIELDS[1:]
+
+# Поля объявления, сохраняемые в хранилище
+SYNC_ANNOUNCEMENT_FIELDS = ("id", "numberAnno", "nameRu", "publishDate", "totalSum", "refTradeMethodsId")
+
+def sync_contracts(conn, bin_company, fin_year, full=False):
+    """Инкрементальная синхронизация договоров (БИН, год) в локальное хранилище
+
+    Загружаются договоры с id больше сохранённой отметки; сохранённые договоры,
+    статус которых ещё может измениться, перезапрашиваются пачками по id.
+    Страницы всегда запрашиваются у API: ответ из кэша не покажет смену статуса.
+    """
+    last_id = 0 if full else store.get_last_id(conn, bin_company, fin_year)
+    open_ids = [] if full else store.get_ids(conn, bin_company, fin_year, OPEN_STATUSES)
+
+    filter = {
+        "customerBin": bin_company,
+        "finYear": fin_year
+    }
+
+    fetched = 0
+    for contracts in paginate("Contract", filter, SYNC_FIELDS, after=last_id, use_cache=False):
+        store.save_contracts(conn, bin_company, fin_year, contracts)
+        fetched += len(contracts)
+        last_id = max(last_id, max(c["id"] for c in contracts))
+
+    for start in range(0, len(open_ids), PAGE_LIMIT):
+        for contracts in paginate("Contract", {"id": open_ids[start:start + PAGE_LIMIT]}, SYNC_FIELDS, use_cache=False):
+            store.save_contracts(conn, bin_company, fin_year, contracts)
+            fetched += len(contracts)
+
+    store.set_last_id(conn, bin_company, fin_year, last_id)
+    return fetched
+
+def sync_announcements(conn, bin_company, fin_year):
+    """Полная перезагрузка объявлений заказчика, опубликованных в финансовом году"""
+    date_from, date_to = f"{fin_year}-01-01", f"{fin_year}-12-31"
+    announcements = list(iter_announcements(date_from, date_to, bin_company, SYNC_ANNOUNCEMENT_FIELDS, use_cache=False))
+    store.save_announcements(conn, bin_company, date_from, date_to, announcements)
+    return len(announcements)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Инкрементальная синхронизация договоров и объявлений в локальное хранилище")
+    parser.add_argument("--bin", nargs="+", default=[config.BIN_COMPANY], help="БИН заказчиков (по умолчанию config.BIN_COMPANY)")
+    parser.add_argument("--year", type=int, default=config.FIN_YEAR, help="финансовый год (по умолчанию config.FIN_YEAR)")
+    parser.add_argument("--full", action="store_true", help="полная перезагрузка без учёта сохранённой отметки")
+    args = parser.parse_args()
+
+    # Хранилище само отвечает за актуальность, кэш ответов здесь не нужен
+    cache.set_mode(cache.MODE_OFF)
+
+    conn = store.connect()
+    for bin_company in args.bin:
+        fetched = sync_contracts(conn, bin_company, args.year, args.full)
+        announcements = sync_announcements(conn, bin_company, args.year)
+        total = store.count_contracts(conn, bin_company, args.year)
+        print(f"{bin_company} / {args.year}: загружено {fetched}, всего в хранилище {total}, объявлений {announcements}")
+    conn.close()